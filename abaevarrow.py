@@ -0,0 +1,94 @@
+from __future__ import annotations
+from dataclasses import fields
+from enum import Enum
+from typing import *
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from libabaev2 import COLLECTION_CLASSES, COLLECTION_FILES, DictionaryBackend, DictionaryData, FormRelType
+
+# Columnar storage of the dictionary in Parquet or Arrow IPC (Feather) files.
+# List fields of Mentioned are stored as list<string> columns instead of comma-joined text, language codes and
+# form relation types are dictionary-encoded, and numbers are nullable int32.
+
+LANG = pa.dictionary(pa.int32(), pa.string())
+FIELD_TYPES = {"str": pa.string(),
+               "int": pa.int32(),
+               "bool": pa.bool_(),
+               "list[str]": pa.list_(pa.string()),
+               "FormRelType": pa.dictionary(pa.int8(), pa.string())}
+LANG_TYPES = {"lang": LANG,
+              "langs": pa.list_(LANG)}
+
+
+def collection_schema(record_class: type) -> pa.Schema:
+    return pa.schema([pa.field(f.name, LANG_TYPES.get(f.name, FIELD_TYPES[f.type])) for f in fields(record_class)])
+
+
+def column_values(values: list, arrow_type: pa.DataType) -> list:
+    # Records extracted from TEI carry some numbers as strings, records read from CSV carry them as ints
+    if arrow_type == pa.int32():
+        return [None if v is None or v == '' else int(v) for v in values]
+    if pa.types.is_dictionary(arrow_type) and arrow_type.index_type == pa.int8():
+        return [v.value if isinstance(v, Enum) else v for v in values]
+    return values
+
+
+def collection_table(records: dict[str, object], record_class: type) -> pa.Table:
+    schema = collection_schema(record_class)
+    values = list(records.values())
+    columns = []
+    for arrow_field in schema:
+        column = [getattr(record, arrow_field.name) for record in values]
+        arrow_type = arrow_field.type
+        if pa.types.is_dictionary(arrow_type):
+            columns.append(pa.array(column_values(column, arrow_type), arrow_type.value_type)
+                           .dictionary_encode().cast(arrow_type))
+        elif pa.types.is_list(arrow_type) and pa.types.is_dictionary(arrow_type.value_type):
+            plain = pa.array(column, pa.list_(pa.string()))
+            encoded = plain.flatten().dictionary_encode().cast(arrow_type.value_type)
+            columns.append(pa.ListArray.from_arrays(plain.offsets, encoded, mask=plain.is_null()))
+        else:
+            columns.append(pa.array(column_values(column, arrow_type), arrow_type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def table_records(table: pa.Table, record_class: type) -> dict[str, object]:
+    columns = [table.column(f.name).to_pylist() for f in fields(record_class)]
+    if "rel_type" in table.column_names:
+        position = table.column_names.index("rel_type")
+        columns[position] = [FormRelType(v) if v is not None else None for v in columns[position]]
+    records = {}
+    for row in zip(*columns):
+        record = record_class(*row)
+        records[record.db_id] = record
+    return records
+
+
+class ArrowBackend(DictionaryBackend):
+    def __init__(self, file_format: str = "parquet"):
+        if file_format not in ("parquet", "feather"):
+            raise ValueError(f"Unknown Arrow file format: {file_format}")
+        self.name = file_format
+        self.extension = "." + file_format
+
+    def tables(self, data: DictionaryData) -> dict[str, pa.Table]:
+        return {collection: collection_table(getattr(data, collection), record_class)
+                for collection, record_class in COLLECTION_CLASSES.items()}
+
+    def write(self, data: DictionaryData, directory: str):
+        for collection, table in self.tables(data).items():
+            if self.name == "parquet":
+                pq.write_table(table, self.path(directory, collection))
+            else:
+                feather.write_feather(table, self.path(directory, collection))
+
+    # Tables can be handed directly to pandas (table.to_pandas()) without going through the dataclasses
+    def read_tables(self, directory: str) -> dict[str, pa.Table]:
+        if self.name == "parquet":
+            return {collection: pq.read_table(self.path(directory, collection)) for collection in COLLECTION_FILES}
+        return {collection: feather.read_table(self.path(directory, collection)) for collection in COLLECTION_FILES}
+
+    def read(self, directory: str) -> DictionaryData:
+        return DictionaryData(**{collection: table_records(table, COLLECTION_CLASSES[collection])
+                                 for collection, table in self.read_tables(directory).items()})
@@ -0,0 +1,177 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import *
+from libabaev2 import COLLECTION_FILES
+
+# Build orchestrator for the nightly pipeline: extract -> load-db, fill-coords -> maps.
+# Each stage lists its input and output files. A stage is skipped when the fingerprint of its inputs and outputs is
+# the one recorded after its last successful run, so an unchanged tree only costs the fingerprinting. Stages run as
+# abaevtools.py subprocesses as soon as the stages they come after are done, so independent stages (load-db and
+# fill-coords) run at the same time.
+# TEI files and the database are fingerprinted by size and mtime; the CSV files and langnames files by content, so
+# that an extraction which reproduces the same CSV files does not trigger a reload of the database.
+
+TOOLS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "abaevtools.py")
+
+
+def list_files(path: str) -> list[str]:
+    if os.path.isdir(path):
+        return sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    return [path]
+
+
+def fingerprint(paths: Iterable[str], content: bool = False) -> str:
+    digest = hashlib.sha1()
+    for path in paths:
+        for filename in list_files(path):
+            if not os.path.exists(filename):
+                digest.update(f"{filename}:missing;".encode())
+            elif content:
+                digest.update(f"{filename}:".encode())
+                with open(filename, "rb") as file:
+                    for block in iter(lambda: file.read(1 << 20), b""):
+                        digest.update(block)
+            else:
+                stat = os.stat(filename)
+                digest.update(f"{filename}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+def git_revision(path: str) -> str:
+    try:
+        return subprocess.run(["git", "-C", path, "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "none"
+
+
+@dataclass
+class Stage:
+    name: str
+    commands: list[list[str]]  # abaevtools.py arguments, run one after the other
+    inputs: list[str]  # Files or directories, fingerprinted by size and mtime
+    outputs: list[str]
+    content_inputs: list[str] = field(default_factory=list)  # Fingerprinted by content
+    after: list[str] = field(default_factory=list)  # Stages that must finish first
+    revisions: list[str] = field(default_factory=list)  # Git checkouts whose HEAD is part of the fingerprint
+
+    def fingerprint(self) -> str:
+        return hashlib.sha1(json.dumps([fingerprint(self.inputs),
+                                        fingerprint(self.content_inputs, content=True),
+                                        fingerprint(self.outputs),
+                                        [git_revision(path) for path in self.revisions],
+                                        self.commands]).encode()).hexdigest()
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str  # "ran", "skipped", "failed" or "blocked" (a stage it comes after failed)
+    seconds: float = 0.0
+    message: str = ""
+
+
+def nightly_stages(entries_dir: str, csv_dir: str, langs: str, glottolog: str, db: str,
+                   filled_langs: str, maps_dir: str, map_entries: list[str]) -> list[Stage]:
+    csv_files = [os.path.join(csv_dir, name + ".csv") for name in COLLECTION_FILES.values()]
+    return [Stage(name="extract",
+                  commands=[["extract", "--entries-dir", entries_dir, "--output-dir", csv_dir]],
+                  inputs=[entries_dir],
+                  outputs=csv_files + [os.path.join(csv_dir, "sources.csv")]),
+            Stage(name="load-db",
+                  commands=[["load-db", "--csv-dir", csv_dir, "--langs", langs, "--glottolog", glottolog,
+                             "--db", db]],
+                  inputs=[],
+                  content_inputs=csv_files + [langs],
+                  outputs=[db],
+                  after=["extract"],
+                  revisions=[glottolog]),
+            Stage(name="fill-coords",
+                  commands=[["fill-coords", langs, "--glottolog", glottolog, "--output", filled_langs]],
+                  inputs=[],
+                  content_inputs=[langs],
+                  outputs=[filled_langs],
+                  revisions=[glottolog]),
+            Stage(name="maps",
+                  commands=[["map", entry, "--csv-dir", csv_dir, "--langs", filled_langs,
+                             "--output", os.path.join(maps_dir, entry + ".html")] for entry in map_entries],
+                  inputs=[],
+                  content_inputs=[os.path.join(csv_dir, "mentioneds.csv"), filled_langs],
+                  outputs=[os.path.join(maps_dir, entry + ".html") for entry in map_entries],
+                  after=["extract", "fill-coords"])]
+
+
+class Builder:
+    def __init__(self, stages: list[Stage], state_file: str = ".abaevbuild.json", force: bool = False,
+                 jobs: int = 4):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_file = state_file
+        self.force = force
+        self.jobs = jobs
+        self.state: dict[str, str] = {}
+        if os.path.exists(state_file):
+            with open(state_file) as file:
+                self.state = json.load(file)
+
+    def run_stage(self, stage: Stage) -> StageResult:
+        start = time.perf_counter()
+        if not self.force and self.state.get(stage.name) == stage.fingerprint():
+            return StageResult(stage.name, "skipped", time.perf_counter() - start)
+        for path in stage.outputs:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+        for command in stage.commands:
+            process = subprocess.run([sys.executable, TOOLS] + command, capture_output=True, text=True)
+            if process.returncode != 0:
+                return StageResult(stage.name, "failed", time.perf_counter() - start,
+                                   process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "")
+        # Recorded after the run, so that the outputs it wrote are part of the fingerprint
+        self.state[stage.name] = stage.fingerprint()
+        return StageResult(stage.name, "ran", time.perf_counter() - start)
+
+    def run(self) -> list[StageResult]:
+        results: dict[str, StageResult] = {}
+        pending = dict(self.stages)
+        running = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                while pending or running:
+                    for name, stage in list(pending.items()):
+                        if any(results.get(before) is not None and results[before].status in ("failed", "blocked")
+                               for before in stage.after):
+                            results[name] = StageResult(name, "blocked")
+                            del pending[name]
+                        elif all(before in results for before in stage.after):
+                            running[executor.submit(self.run_stage, stage)] = name
+                            del pending[name]
+                    if not running:
+                        if pending:
+                            raise ValueError(f"Stages wait for unknown or cyclic stages: {', '.join(pending)}")
+                        break
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        try:
+                            results[name] = future.result()
+                        except Exception as error:
+                            # E.g. a missing interpreter or output directory; the stage fails like a non-zero exit
+                            results[name] = StageResult(name, "failed", message=f"{type(error).__name__}: {error}")
+        finally:
+            # Saved even when stages failed, so that the stages that finished are skipped next time
+            with open(self.state_file, "w") as file:
+                json.dump(self.state, file, indent=1)
+        return [results[name] for name in self.stages]
+
+
+def summary(results: list[StageResult], seconds: float) -> str:
+    lines = [f"{result.name:12} {result.status:8} {result.seconds:8.2f}s  {result.message}".rstrip()
+             for result in results]
+    lines.append(f"{'total':12} {'':8} {seconds:8.2f}s")
+    return "\n".join(lines)
@@ -0,0 +1,173 @@
+from __future__ import annotations
+import argparse
+import csv
+import os
+import sys
+from dataclasses import dataclass
+from typing import *
+import libabaev2 as abv
+
+# Integrity checker for the generated dictionary data.
+# Every cross-collection reference is checked with one pass over each collection against hash sets of the
+# referenced ids, and all problems are collected and reported together instead of failing on the first one.
+# Usage: abaevcheck.py [--csv-dir csv] [--langs langnames.csv]; exits with 1 if there are errors.
+
+
+@dataclass
+class Problem:
+    collection: str  # Name of the collection the broken record is in
+    db_id: str
+    field: str
+    value: str
+    message: str
+    severity: str = "error"  # "error" or "warning"; only errors make the check fail
+
+    def __str__(self):
+        return f"{self.severity}: {self.collection}/{self.db_id}: {self.field}={self.value!r}: {self.message}"
+
+
+def check_dictionary(entries: abv.EntryDict,
+                     forms: abv.FormDict,
+                     senses: abv.SenseDict,
+                     sense_groups: abv.SenseGroupDict,
+                     examples: abv.ExampleDict,
+                     example_groups: abv.ExampleGroupDict,
+                     mentioneds: abv.MentionedDict,
+                     langs: abv.LanguageDict = None) -> list[Problem]:
+    problems = []
+
+    def check_ref(collection: str, db_id: str, field: str, value: Optional[str], targets: Container, target: str):
+        if value and value not in targets:
+            problems.append(Problem(collection, db_id, field, value, f"no such {target}"))
+
+    def check_lang(collection: str, db_id: str, value: Optional[str]):
+        if langs is not None and value and value not in langs:
+            problems.append(Problem(collection, db_id, "lang", value, "language code not in LanguageDict"))
+
+    for entry in entries.values():
+        check_ref("entries", entry.db_id, "main_entry", entry.main_entry, entries, "entry")
+        if entry.main_entry and entry.main_entry in entries and entries[entry.main_entry].main_entry:
+            problems.append(Problem("entries", entry.db_id, "main_entry", entry.main_entry,
+                                    "main entry is itself a subentry"))
+        check_lang("entries", entry.db_id, entry.lang)
+
+    for form in forms.values():
+        check_ref("forms", form.db_id, "entry_id", form.entry_id, entries, "entry")
+        check_ref("forms", form.db_id, "rel_of", form.rel_of, forms, "form")
+        if form.rel_of and form.rel_type is None:
+            # Occurs in the sources; such forms are shown as related without a relation
+            problems.append(Problem("forms", form.db_id, "rel_type", None, "related form without relation type",
+                                    severity="warning"))
+        check_lang("forms", form.db_id, form.lang)
+
+    for sense_group in sense_groups.values():
+        check_ref("senseGroups", sense_group.db_id, "entry_id", sense_group.entry_id, entries, "entry")
+
+    for sense in senses.values():
+        check_ref("senses", sense.db_id, "entry_id", sense.entry_id, entries, "entry")
+        check_ref("senses", sense.db_id, "sense_group", sense.sense_group, sense_groups, "sense group")
+        if sense.sense_group in sense_groups and sense_groups[sense.sense_group].entry_id != sense.entry_id:
+            problems.append(Problem("senses", sense.db_id, "sense_group", sense.sense_group,
+                                    "sense group belongs to another entry"))
+        check_lang("senses", sense.db_id, sense.lang)
+
+    for example_group in example_groups.values():
+        check_ref("exampleGroups", example_group.db_id, "entry_id", example_group.entry_id, entries, "entry")
+
+    for example in examples.values():
+        check_ref("examples", example.db_id, "entry_id", example.entry_id, entries, "entry")
+        check_ref("examples", example.db_id, "example_group", example.example_group, example_groups,
+                  "example group")
+        if example.example_group in example_groups and \
+                example_groups[example.example_group].entry_id != example.entry_id:
+            problems.append(Problem("examples", example.db_id, "example_group", example.example_group,
+                                    "example group belongs to another entry"))
+        check_lang("examples", example.db_id, example.lang)
+
+    for mentioned in mentioneds.values():
+        check_ref("mentioneds", mentioned.db_id, "entry_id", mentioned.entry_id, entries, "entry")
+        check_ref("mentioneds", mentioned.db_id, "same_as", mentioned.same_as, mentioneds, "mentioned")
+        for lang in mentioned.langs or []:
+            check_lang("mentioneds", mentioned.db_id, lang)
+
+    # Record ids are unique across the whole dictionary, so no id may appear in two collections. The other xml ids of
+    # a mentioned form are those of its equivalents in the other languages (corresp), which several mentioned forms
+    # may share, so they are only required to be there
+    seen = {}
+    for collection, records in [("entries", entries), ("forms", forms), ("senseGroups", sense_groups),
+                                ("senses", senses), ("exampleGroups", example_groups), ("examples", examples),
+                                ("mentioneds", mentioneds)]:
+        for db_id in records:
+            if db_id in seen:
+                problems.append(Problem(collection, db_id, "db_id", db_id, f"id also used in {seen[db_id]}"))
+            else:
+                seen[db_id] = collection
+    for mentioned in mentioneds.values():
+        if not mentioned.xml_id or not all(mentioned.xml_id):
+            problems.append(Problem("mentioneds", mentioned.db_id, "xml_id", mentioned.xml_id, "missing xml id"))
+
+    return problems
+
+
+def check_duplicate_rows(filename: str, collection: str) -> list[Problem]:
+    # The get_*_from_csv readers keep only the last row for each id, so duplicates must be found on the raw file
+    problems = []
+    seen = {}
+    with abv.open_file(filename, "r") as file:
+        csv_reader = csv.DictReader(file, delimiter=",")
+        for row in csv_reader:
+            db_id = row["db_id"]
+            if db_id in seen:
+                problems.append(Problem(collection, db_id, "db_id", db_id,
+                                        f"duplicate id (rows {seen[db_id]} and {csv_reader.line_num})"))
+            else:
+                seen[db_id] = csv_reader.line_num
+    return problems
+
+
+CSV_READERS = {"entries": abv.get_entries_from_csv,
+               "forms": abv.get_forms_from_csv,
+               "senses": abv.get_senses_from_csv,
+               "senseGroups": abv.get_sense_groups_from_csv,
+               "examples": abv.get_examples_from_csv,
+               "exampleGroups": abv.get_example_groups_from_csv,
+               "mentioneds": abv.get_mentioneds_from_csv}
+
+
+def check_csv_dir(csv_dir: str, langs: abv.LanguageDict = None) -> list[Problem]:
+    problems = []
+    loaded = {}
+    for collection, reader in CSV_READERS.items():
+        filename = abv.find_file(os.path.join(csv_dir, collection + ".csv"))
+        problems += check_duplicate_rows(filename, collection)
+        loaded[collection] = reader(filename)
+    problems += check_dictionary(entries=loaded["entries"],
+                                 forms=loaded["forms"],
+                                 senses=loaded["senses"],
+                                 sense_groups=loaded["senseGroups"],
+                                 examples=loaded["examples"],
+                                 example_groups=loaded["exampleGroups"],
+                                 mentioneds=loaded["mentioneds"],
+                                 langs=langs)
+    return problems
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Check references and ids in the Abaev CSV files")
+    parser.add_argument("--csv-dir", default="csv")
+    parser.add_argument("--langs", default=None, help="langnames.csv; language codes are checked only if given")
+    args = parser.parse_args(argv)
+
+    langs = abv.LanguageDict.from_csv(args.langs) if args.langs else None
+    problems = check_csv_dir(args.csv_dir, langs)
+    for problem in problems:
+        print(problem)
+    errors = sum(problem.severity == "error" for problem in problems)
+    if problems:
+        print(f"{errors} errors, {len(problems) - errors} warnings", file=sys.stderr)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+from __future__ import annotations
+import os
+import re
+from typing import *
+from libabaev2 import *
+
+# Export of the dictionary as a CLDF Dictionary dataset (https://cldf.clld.org) with pycldf.
+# Entries, senses, examples and languages go to the standard EntryTable, SenseTable, ExampleTable and LanguageTable;
+# forms and mentioned forms go to the custom tables forms.csv and etymology.csv. Every table is written from a
+# generator that reads the corresponding CSV file one row at a time, so memory does not grow with the dictionary.
+# The LanguageTable is written last, from the language list plus every code the other tables referred to, so that
+# all language references resolve.
+
+TERMS = "http://cldf.clld.org/v1.0/terms.rdf#"
+LIST_SEPARATOR = "\t"  # Mentioned forms and glosses contain commas and semicolons, but no tabs
+INVALID_ID_CHARS = re.compile(r"[^A-Za-z0-9_\-]")
+
+
+def cldf_id(db_id: Optional[str]) -> Optional[str]:
+    # CLDF ids are restricted to [A-Za-z0-9_-]; other characters are replaced by their code point in hex between
+    # dashes, so cʼūtxal becomes c-2bc--16b-txal
+    if db_id is None:
+        return None
+    return INVALID_ID_CHARS.sub(lambda match: f"-{ord(match.group(0)):x}-", db_id)
+
+
+def iter_records(directory: str, collection: str) -> Iterator[object]:
+    with open_file(find_file(os.path.join(directory, COLLECTION_FILES[collection] + ".csv")), "r") as file:
+        for row in csv.DictReader(file, delimiter=","):
+            yield CSV_ROW_READERS[collection](row)
+
+
+def make_dataset(output_dir: str):
+    from pycldf import Dictionary
+    dataset = Dictionary.in_dir(output_dir)
+    dataset.add_component("ExampleTable")
+    dataset.add_component("LanguageTable")
+    dataset.add_columns("EntryTable",
+                        {"name": "Main_Entry_ID", "datatype": "string"},
+                        {"name": "Number", "datatype": "integer"})
+    dataset.add_columns("SenseTable",
+                        {"name": "Description_RU", "datatype": "string"},
+                        {"name": "Number", "datatype": "string"})
+    dataset.add_columns("ExampleTable",
+                        {"name": "Entry_ID", "propertyUrl": TERMS + "entryReference"},
+                        {"name": "Primary_Text_Cyrillic", "datatype": "string"},
+                        {"name": "Translated_Text_RU", "datatype": "string"})
+    dataset.add_table("forms.csv",
+                      {"name": "ID", "propertyUrl": TERMS + "id"},
+                      {"name": "Entry_ID", "propertyUrl": TERMS + "entryReference", "required": True},
+                      {"name": "Language_ID", "propertyUrl": TERMS + "languageReference"},
+                      {"name": "Form", "propertyUrl": TERMS + "form", "required": True},
+                      {"name": "Form_Cyrillic", "datatype": "string"},
+                      {"name": "Related_Form_ID", "datatype": "string"},
+                      {"name": "Relation", "datatype": {"base": "string", "format": "variant|participle"}})
+    dataset.add_table("etymology.csv",
+                      {"name": "ID", "propertyUrl": TERMS + "id"},
+                      {"name": "Entry_ID", "propertyUrl": TERMS + "entryReference", "required": True},
+                      {"name": "Language_IDs", "separator": LIST_SEPARATOR},
+                      {"name": "Forms", "separator": LIST_SEPARATOR},
+                      {"name": "Glosses_RU", "separator": LIST_SEPARATOR},
+                      {"name": "Glosses_EN", "separator": LIST_SEPARATOR},
+                      {"name": "Same_As_ID", "datatype": "string"})
+    dataset.add_foreign_key("EntryTable", "Main_Entry_ID", "EntryTable", "ID")
+    dataset.add_foreign_key("forms.csv", "Related_Form_ID", "forms.csv", "ID")
+    dataset.add_foreign_key("etymology.csv", "Language_IDs", "LanguageTable", "ID")
+    dataset.add_foreign_key("etymology.csv", "Same_As_ID", "etymology.csv", "ID")
+    dataset.properties["dc:title"] = "Abaev, Historical-etymological dictionary of the Ossetic language"
+    return dataset
+
+
+def export_cldf(csv_dir: str, langs: LanguageDict, output_dir: str, validate: bool = True) -> dict[str, int]:
+    dataset = make_dataset(output_dir)
+    used_langs = set()
+    skipped = {"senses": 0}
+
+    def lang(code: Optional[str]) -> Optional[str]:
+        if code:
+            used_langs.add(code)
+        return cldf_id(code)
+
+    def entry_rows():
+        for entry in iter_records(csv_dir, "entries"):
+            yield {"ID": cldf_id(entry.db_id),
+                   "Language_ID": lang(entry.lang),
+                   "Headword": entry.lemma,
+                   "Main_Entry_ID": cldf_id(entry.main_entry),
+                   "Number": int(entry.num) if entry.num else None}
+
+    def sense_rows():
+        for sense in iter_records(csv_dir, "senses"):
+            # Description is required in CLDF; senses without either description carry no content
+            if not (sense.description_en or sense.description_ru):
+                skipped["senses"] += 1
+                continue
+            yield {"ID": cldf_id(sense.db_id),
+                   "Description": sense.description_en or sense.description_ru,
+                   "Entry_ID": cldf_id(sense.entry_id),
+                   "Description_RU": sense.description_ru,
+                   "Number": sense.num}
+
+    def example_rows():
+        for example in iter_records(csv_dir, "examples"):
+            yield {"ID": cldf_id(example.db_id),
+                   "Language_ID": lang(example.lang),
+                   "Primary_Text": example.text,
+                   "Translated_Text": example.tr_en,
+                   "Entry_ID": cldf_id(example.entry_id),
+                   "Primary_Text_Cyrillic": example.text_cyr,
+                   "Translated_Text_RU": example.tr_ru}
+
+    def form_rows():
+        for form in iter_records(csv_dir, "forms"):
+            yield {"ID": cldf_id(form.db_id),
+                   "Entry_ID": cldf_id(form.entry_id),
+                   "Language_ID": lang(form.lang),
+                   "Form": form.orth,
+                   "Form_Cyrillic": form.orth_cyr,
+                   "Related_Form_ID": cldf_id(form.rel_of),
+                   "Relation": form.rel_type.value if form.rel_type else None}
+
+    def etymology_rows():
+        for mentioned in iter_records(csv_dir, "mentioneds"):
+            yield {"ID": cldf_id(mentioned.db_id),
+                   "Entry_ID": cldf_id(mentioned.entry_id),
+                   "Language_IDs": [lang(code) for code in mentioned.langs or []],
+                   "Forms": mentioned.form or [],
+                   "Glosses_RU": mentioned.gloss_ru or [],
+                   "Glosses_EN": mentioned.gloss_en or [],
+                   "Same_As_ID": cldf_id(mentioned.same_as)}
+
+    def language_rows():
+        for code in sorted(used_langs | langs.keys()):
+            language = langs.get(code)
+            located = language is not None and (language.latitude or language.longitude)
+            yield {"ID": cldf_id(code),
+                   "Name": language.name_en if language else code,
+                   "Glottocode": language.glottocode if language else None,
+                   "Latitude": language.latitude if located else None,
+                   "Longitude": language.longitude if located else None}
+
+    # Keyword order is the writing order; LanguageTable must come after every table that refers to languages
+    dataset.write(EntryTable=entry_rows(),
+                  SenseTable=sense_rows(),
+                  ExampleTable=example_rows(),
+                  **{"forms.csv": form_rows(), "etymology.csv": etymology_rows()},
+                  LanguageTable=language_rows())
+
+    counts = {str(table.url): table.common_props["dc:extent"] for table in dataset.tables}
+    counts["skipped senses"] = skipped["senses"]
+    if validate:
+        dataset.validate()
+    return counts
@@ -0,0 +1,106 @@
+from __future__ import annotations
+import re
+import unicodedata
+from typing import *
+from libabaev2 import *
+
+# Transliteration of the Latin transcription of Ossetic forms and examples into Ossetic Cyrillic.
+# The table of Latin sequences is compiled into a regular expression over the multi-letter sequences, whose
+# alternatives are ordered longest first (kʼ˳ before kʼ, ja before j), and a str.translate table for the single
+# letters. The expression replaces every multi-letter match with Cyrillic in one pass, and the translate table then
+# converts the remaining Latin letters, so each text is scanned twice in C instead of once per table row.
+# %i…%i segments (editorial comments) and %s…%s segments (glosses and source references) are copied unchanged, as
+# are the markup codes themselves.
+
+IRON = {"a": "а", "ā": "а", "b": "б", "c": "ц", "č": "ч", "d": "д", "e": "е", "ē": "е", "f": "ф",
+        "g": "г", "ǵ": "г", "ǧ": "гъ", "h": "х", "i": "и", "ī": "и", "j": "й", "k": "к", "ḱ": "к",
+        "l": "л", "m": "м", "n": "н", "o": "о", "ō": "о", "p": "п", "q": "хъ", "r": "р", "s": "с",
+        "š": "ш", "t": "т", "u": "у", "ū": "у", "v": "в", "w": "у", "x": "х", "y": "ы", "z": "з",
+        "ž": "ж", "ʒ": "дз", "ǯ": "дж", "æ": "ӕ", "ᵆ": "ӕ",
+        # Ejectives
+        "kʼ": "къ", "ḱʼ": "къ", "pʼ": "пъ", "tʼ": "тъ", "cʼ": "цъ", "čʼ": "чъ",
+        # Labialized consonants; the labialized ejective is spelled with the marks in either order
+        "k˳": "ку", "ḱ˳": "ку", "g˳": "гу", "ǵ˳": "гу", "x˳": "ху", "q˳": "хъу", "ǧ˳": "гъу",
+        "kʼ˳": "къу", "k˳ʼ": "къу", "ḱ˳ʼ": "къу",
+        # Iotated vowels
+        "ja": "я", "jā": "я", "ju": "ю", "jū": "ю", "je": "е",
+        # Syllable boundary mark
+        "ʽ": ""}
+
+# The ejective mark is also typed with ASCII and typographic apostrophes
+for key, value in list(IRON.items()):
+    if "ʼ" in key:
+        IRON[key.replace("ʼ", "'")] = value
+        IRON[key.replace("ʼ", "’")] = value
+
+# Digor is written with the same letters and uses the Iron table unchanged
+TABLES = {"iron": IRON}
+
+# Languages whose forms are transliterated and the table used for each
+DIALECTS = {"os": "iron",
+            "os-x-iron": "iron",
+            "os-x-south": "iron",
+            "os-x-digor": "iron"}
+
+ACUTE = "́"
+VERBATIM = re.compile(r"(%i.*?%i|%s.*?%s|%[a-z])")
+
+
+class Transliterator:
+    def __init__(self, table: dict[str, str]):
+        self.table = {}
+        for key, value in table.items():
+            self.table[key] = value
+            # Stressed vowels keep their accent as a combining acute
+            if value and key[-1] in "aeiouyæ":
+                self.table[unicodedata.normalize("NFC", key + ACUTE)] = value + ACUTE
+        for key, value in list(self.table.items()):
+            self.table.setdefault(key[0].upper() + key[1:], value[:1].upper() + value[1:])
+        self.letters = str.maketrans({key: value for key, value in self.table.items() if len(key) == 1})
+        sequences = sorted((key for key in self.table if len(key) > 1), key=len, reverse=True)
+        self.pattern = re.compile("|".join(re.escape(key) for key in sequences))
+
+    def replace(self, match: re.Match) -> str:
+        return self.table[match.group(0)]
+
+    def convert(self, text: str) -> str:
+        return self.pattern.sub(self.replace, text).translate(self.letters)
+
+    def __call__(self, text: str) -> str:
+        text = unicodedata.normalize("NFC", text)
+        if "%" not in text:
+            return self.convert(text)
+        parts = VERBATIM.split(text)
+        return "".join(part if i % 2 else self.convert(part) for i, part in enumerate(parts))
+
+
+TRANSLITERATORS = {dialect: Transliterator(table) for dialect, table in TABLES.items()}
+
+
+def transliterator_for(lang: Optional[str]) -> Optional[Transliterator]:
+    dialect = DIALECTS.get(lang)
+    return TRANSLITERATORS[dialect] if dialect else None
+
+
+def transliterate(text: Optional[str], lang: Optional[str]) -> Optional[str]:
+    transliterator = transliterator_for(lang)
+    if transliterator is None or text is None:
+        return None
+    return transliterator(text)
+
+
+def transliterate_forms(forms: FormDict) -> int:
+    # Fill orth_cyr of all Ossetic forms in place, return the number of forms transliterated
+    count = 0
+    for form in forms.values():
+        form.orth_cyr = transliterate(form.orth, form.lang)
+        count += form.orth_cyr is not None
+    return count
+
+
+def transliterate_examples(examples: ExampleDict) -> int:
+    count = 0
+    for example in examples.values():
+        example.text_cyr = transliterate(example.text, example.lang)
+        count += example.text_cyr is not None
+    return count
@@ -0,0 +1,189 @@
+from __future__ import annotations
+from typing import *
+import sqlalchemy as db
+from sqlalchemy.ext.declarative import declarative_base
+import libabaev2 as abv
+from abaevdocs import bundle_documents, bundle_hash
+
+# Database model
+Base = declarative_base()
+
+
+class Language(Base):
+    __tablename__ = 'languages'
+
+    lang_id = db.Column(db.Integer, primary_key=True)
+    lang_ru = db.Column(db.Text, nullable=False)
+    lang_en = db.Column(db.Text, nullable=False)
+    glottocode = db.Column(db.Text, nullable=True)
+    ISO = db.Column(db.Text, nullable=True)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+
+
+class Unit(Base):
+    __tablename__ = 'units'
+
+    unit_id = db.Column(db.Integer, primary_key=True)
+    xml_id = db.Column(db.Text, index=True)
+    parent_id = db.Column(db.Integer, default=None)
+    full_entry = db.Column(db.Text)  # JSON document of the entry, see abaevdocs
+    status = db.Column(db.Integer, default=1, nullable=False)  # will be found in dictionary search (1) or not (?),
+    lang_id = db.Column(db.Integer, db.ForeignKey(Language.lang_id), nullable=False)
+
+
+# Ancestor/descendant closure of the language hierarchy (see abaevlangs), one row per pair including depth 0 rows.
+# Codes are language codes, or glottocodes for Glottolog groupings that are not in the language list.
+class LanguageClosure(Base):
+    __tablename__ = 'language_closure'
+
+    ancestor = db.Column(db.Text, primary_key=True)
+    descendant = db.Column(db.Text, primary_key=True)
+    depth = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (db.Index('ix_language_closure_descendant', 'descendant', 'ancestor'),)
+
+
+# Hash of the source records of each main entry bundle whose documents are stored in Unit.full_entry
+class EntryDocumentHash(Base):
+    __tablename__ = 'entry_document_hashes'
+
+    entry_id = db.Column(db.Text, primary_key=True)
+    source_hash = db.Column(db.Text, nullable=False)
+
+
+def store_documents(session, bundle: abv.EntryBundle, source_hash: str = None):
+    for db_id, document in bundle_documents(bundle).items():
+        session.query(Unit).filter_by(xml_id=db_id).update({Unit.full_entry: document}, synchronize_session=False)
+    session.execute(db.insert(EntryDocumentHash).prefix_with("OR REPLACE")
+                    .values(entry_id=bundle.entry.db_id, source_hash=source_hash or bundle_hash(bundle)))
+
+
+def update_full_entries(session, directory: str = "csv", force: bool = False) -> dict[str, int]:
+    # Rebuild the entry documents of the bundles whose source records changed since the last run. Bundles are
+    # streamed, so only one main entry with its subentries is in memory at a time.
+    stored = dict(session.query(EntryDocumentHash.entry_id, EntryDocumentHash.source_hash))
+    counts = {"built": 0, "unchanged": 0, "removed": 0}
+    seen = set()
+    for bundle in abv.iter_entry_bundles(directory):
+        entry_id = bundle.entry.db_id
+        seen.add(entry_id)
+        source_hash = bundle_hash(bundle)
+        if not force and stored.get(entry_id) == source_hash:
+            counts["unchanged"] += 1
+            continue
+        store_documents(session, bundle, source_hash)
+        counts["built"] += 1
+    for entry_id in stored.keys() - seen:
+        session.query(EntryDocumentHash).filter_by(entry_id=entry_id).delete(synchronize_session=False)
+        counts["removed"] += 1
+    session.commit()
+    return counts
+
+
+# Loading is done by upserts keyed by language code and entry id, so that loading into an existing database updates
+# it in place: unit ids stay stable, and the stored entry documents stay valid for the entries that did not change.
+# None of these functions commits; callers commit once, so a load is applied completely or not at all.
+
+def sync_languages(session, langs: abv.LanguageDict) -> dict[str, int]:
+    counts = {"inserted": 0, "updated": 0, "deleted": 0}
+    existing = {}
+    for language in session.query(Language).order_by(Language.lang_id):
+        if language.ISO in existing:
+            # Left over from loads before loading was done by upserts
+            session.delete(language)
+            counts["deleted"] += 1
+        else:
+            existing[language.ISO] = language
+    for lang in langs.values():
+        values = {"lang_ru": lang.name_ru,
+                  "lang_en": lang.name_en,
+                  "glottocode": lang.glottocode,
+                  "ISO": lang.code,
+                  "latitude": lang.latitude,
+                  "longitude": lang.longitude}
+        language = existing.pop(lang.code, None)
+        if language is None:
+            session.add(Language(**values))
+            counts["inserted"] += 1
+        elif any(getattr(language, key) != value for key, value in values.items()):
+            for key, value in values.items():
+                setattr(language, key, value)
+            counts["updated"] += 1
+    for language in existing.values():
+        session.delete(language)
+        counts["deleted"] += 1
+    session.flush()
+    return counts
+
+
+def sync_closure(session, closure_rows: Iterable[tuple[str, str, int]]):
+    session.query(LanguageClosure).delete(synchronize_session=False)
+    session.bulk_insert_mappings(LanguageClosure, [{"ancestor": ancestor, "descendant": descendant, "depth": depth}
+                                                   for ancestor, descendant, depth in closure_rows])
+
+
+def sync_language_tables(session, langs: abv.LanguageDict, data: abv.DictionaryData,
+                         glottolog_path: str = None) -> dict[str, int]:
+    # Languages and their hierarchy closure, which also covers the codes used in the data but missing from langs
+    from abaevlangs import LanguageHierarchy
+    used_codes = {lang for mentioned in data.mentioneds.values() for lang in mentioned.langs or []} | \
+                 {record.lang for collection in [data.entries, data.forms, data.senses, data.examples]
+                  for record in collection.values() if record.lang}
+    hierarchy = LanguageHierarchy.from_language_dict(langs, codes=used_codes, glottolog_path=glottolog_path)
+    counts = sync_languages(session, langs)
+    sync_closure(session, hierarchy.closure_rows())
+    return counts
+
+
+def upsert_units(session, entries: Iterable[abv.Entry]) -> dict[str, int]:
+    # Main entries are written before subentries, whose units take their parent's id and language
+    counts = {"inserted": 0, "updated": 0}
+    units = {xml_id: (unit_id, parent_id, lang_id)
+             for xml_id, unit_id, parent_id, lang_id in session.query(Unit.xml_id, Unit.unit_id, Unit.parent_id,
+                                                                      Unit.lang_id)}
+    lang_ids = dict(session.query(Language.ISO, Language.lang_id))
+    entries = sorted(entries, key=lambda entry: bool(entry.main_entry))
+    added = {}
+    for entry in entries:
+        if entry.main_entry:
+            if added:
+                session.flush()
+                units.update({xml_id: (unit.unit_id, unit.parent_id, unit.lang_id) for xml_id, unit in added.items()})
+                added = {}
+            parent_id, _, lang_id = units[entry.main_entry]
+        else:
+            parent_id, lang_id = None, lang_ids[entry.lang]
+        if entry.db_id not in units:
+            added[entry.db_id] = Unit(xml_id=entry.db_id, parent_id=parent_id, lang_id=lang_id)
+            session.add(added[entry.db_id])
+            counts["inserted"] += 1
+        elif units[entry.db_id][1:] != (parent_id, lang_id):
+            session.query(Unit).filter_by(xml_id=entry.db_id).update({Unit.parent_id: parent_id,
+                                                                      Unit.lang_id: lang_id},
+                                                                     synchronize_session=False)
+            units[entry.db_id] = (units[entry.db_id][0], parent_id, lang_id)
+            counts["updated"] += 1
+    session.flush()
+    return counts
+
+
+def delete_units(session, xml_ids: Iterable[str]) -> int:
+    xml_ids = list(xml_ids)
+    # Chunks stay below the SQLite limit on bound parameters
+    for start in range(0, len(xml_ids), 500):
+        chunk = xml_ids[start:start + 500]
+        session.query(Unit).filter(Unit.xml_id.in_(chunk)).delete(synchronize_session=False)
+        session.query(EntryDocumentHash).filter(EntryDocumentHash.entry_id.in_(chunk)) \
+            .delete(synchronize_session=False)
+    return len(xml_ids)
+
+
+def sync_units(session, entries: abv.EntryDict) -> dict[str, int]:
+    # Databases loaded before loading was done by upserts have one unit per load for each entry; keep the first
+    first_units = db.select(db.func.min(Unit.unit_id)).group_by(Unit.xml_id)
+    session.query(Unit).filter(Unit.unit_id.not_in(first_units)).delete(synchronize_session=False)
+    counts = upsert_units(session, entries.values())
+    stale = {xml_id for xml_id, in session.query(Unit.xml_id)} - entries.keys()
+    counts["deleted"] = delete_units(session, stale)
+    return counts
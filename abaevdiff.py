@@ -0,0 +1,177 @@
+from __future__ import annotations
+import argparse
+import hashlib
+import sys
+from dataclasses import dataclass, field, fields
+from enum import Enum
+from typing import *
+import libabaev2 as abv
+
+# Diff of two dictionary snapshots (directories of CSV files, or of any other backend) and incremental loading of the
+# difference into abaev.db.
+# Records are matched by id in each collection and compared by a hash of their fields, so a diff is one pass over
+# each collection of both snapshots. The changeset lists inserted, updated and deleted records per collection; it is
+# printed as a changelog, and apply_changeset writes it to an existing database in one transaction, touching only the
+# changed units and the documents of the entries whose records changed.
+# Usage: abaevdiff.py OLD_DIR NEW_DIR [--db abaev.db --langs langnames.csv] [--format csv]
+
+
+def record_hash(record) -> str:
+    return hashlib.sha1(repr(record).encode()).hexdigest()
+
+
+@dataclass
+class CollectionChanges:
+    inserted: dict[str, object] = field(default_factory=dict)
+    updated: dict[str, tuple[object, object]] = field(default_factory=dict)  # id -> (old, new)
+    deleted: dict[str, object] = field(default_factory=dict)
+
+    def __len__(self):
+        return len(self.inserted) + len(self.updated) + len(self.deleted)
+
+
+@dataclass
+class Changeset:
+    collections: dict[str, CollectionChanges] = field(default_factory=dict)
+
+    def __len__(self):
+        return sum(len(changes) for changes in self.collections.values())
+
+    def counts(self) -> dict[str, tuple[int, int, int]]:
+        return {collection: (len(changes.inserted), len(changes.updated), len(changes.deleted))
+                for collection, changes in self.collections.items()}
+
+    def entry_ids(self) -> set[str]:
+        # Ids of the entries that any changed record belongs to, in the old or the new snapshot
+        ids = set()
+        for collection, changes in self.collections.items():
+            key = "db_id" if collection == "entries" else "entry_id"
+            ids |= {getattr(record, key) for record in changes.inserted.values()}
+            ids |= {getattr(record, key) for record in changes.deleted.values()}
+            for old, new in changes.updated.values():
+                ids |= {getattr(old, key), getattr(new, key)}
+        return ids
+
+
+def diff_collection(old: dict[str, object], new: dict[str, object]) -> CollectionChanges:
+    changes = CollectionChanges()
+    for db_id, record in new.items():
+        if db_id not in old:
+            changes.inserted[db_id] = record
+        elif record_hash(record) != record_hash(old[db_id]):
+            changes.updated[db_id] = (old[db_id], record)
+    for db_id, record in old.items():
+        if db_id not in new:
+            changes.deleted[db_id] = record
+    return changes
+
+
+def diff_dictionaries(old: abv.DictionaryData, new: abv.DictionaryData) -> Changeset:
+    return Changeset({collection: diff_collection(getattr(old, collection), getattr(new, collection))
+                      for collection in abv.COLLECTION_FILES})
+
+
+def field_changes(old, new) -> Iterator[tuple[str, object, object]]:
+    for record_field in fields(old):
+        old_value, new_value = getattr(old, record_field.name), getattr(new, record_field.name)
+        if old_value != new_value:
+            yield record_field.name, old_value, new_value
+
+
+def changelog(changeset: Changeset) -> Iterator[str]:
+    def show(value) -> str:
+        return repr(value.value if isinstance(value, Enum) else value)
+
+    for collection, changes in changeset.collections.items():
+        for db_id in changes.inserted:
+            yield f"+ {collection}/{db_id}"
+        for db_id, (old, new) in changes.updated.items():
+            yield f"~ {collection}/{db_id}: " + ", ".join(f"{name} {show(old_value)} -> {show(new_value)}"
+                                                          for name, old_value, new_value in field_changes(old, new))
+        for db_id in changes.deleted:
+            yield f"- {collection}/{db_id}"
+
+
+def main_entry_of(entry_id: str, *snapshots: abv.DictionaryData) -> Optional[str]:
+    for snapshot in snapshots:
+        if entry_id in snapshot.entries:
+            return snapshot.entries[entry_id].main_entry or entry_id
+    return None
+
+
+def entry_bundles(data: abv.DictionaryData, entry_ids: set[str]) -> Iterator[abv.EntryBundle]:
+    # Bundles of the given main entries, with their records in the same order as iter_entry_bundles gives them
+    bundles = {db_id: abv.EntryBundle(entry=data.entries[db_id]) for db_id in data.entries if db_id in entry_ids}
+    owner = dict((db_id, db_id) for db_id in bundles)
+    for entry in data.entries.values():
+        if entry.main_entry in bundles:
+            bundles[entry.main_entry].subentries[entry.db_id] = entry
+            owner[entry.db_id] = entry.main_entry
+    for collection in abv.COLLECTION_FILES:
+        if collection == "entries":
+            continue
+        for db_id, record in getattr(data, collection).items():
+            if record.entry_id in owner:
+                getattr(bundles[owner[record.entry_id]], collection)[db_id] = record
+    return iter(bundles.values())
+
+
+def apply_changeset(session, changeset: Changeset, old: abv.DictionaryData, new: abv.DictionaryData,
+                    langs: abv.LanguageDict, glottolog_path: str = None) -> dict[str, int]:
+    # Write the changes to an existing database loaded from the old snapshot; commits once, rolls back on errors.
+    # Languages are synced first, as in a full load, so that new records can refer to new language codes.
+    from abaevdb import delete_units, store_documents, sync_language_tables, upsert_units
+
+    entries = changeset.collections["entries"]
+    main_ids = {main_entry_of(entry_id, new, old) for entry_id in changeset.entry_ids()} - {None}
+    try:
+        languages = sync_language_tables(session, langs, new, glottolog_path=glottolog_path)
+        counts = upsert_units(session, list(entries.inserted.values()) +
+                              [new_entry for _, new_entry in entries.updated.values()])
+        counts["deleted"] = delete_units(session, entries.deleted)
+        counts["languages"] = languages["inserted"] + languages["updated"] + languages["deleted"]
+        counts["documents"] = 0
+        for bundle in entry_bundles(new, main_ids):
+            store_documents(session, bundle)
+            counts["documents"] += 1
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return counts
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Compare two snapshots of the Abaev dictionary data")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--format", choices=abv.BACKENDS, default="csv")
+    parser.add_argument("--db", default=None, help="apply the changes to this SQLite database, loaded from OLD")
+    parser.add_argument("--langs", default="../abaev-tei-oxygen/css/langnames.csv",
+                        help="language list synced into the database with --db")
+    parser.add_argument("--glottolog", default="./glottolog")
+    parser.add_argument("--quiet", action="store_true", help="print only the counts, not the changelog")
+    args = parser.parse_args(argv)
+
+    backend = abv.get_backend(args.format)
+    old, new = backend.read(args.old), backend.read(args.new)
+    changeset = diff_dictionaries(old, new)
+    if not args.quiet:
+        for line in changelog(changeset):
+            print(line)
+    for collection, (inserted, updated, deleted) in changeset.counts().items():
+        print(f"{collection}: {inserted} inserted, {updated} updated, {deleted} deleted", file=sys.stderr)
+
+    if args.db and len(changeset):
+        import sqlalchemy as db
+        from sqlalchemy.orm import sessionmaker
+        session = sessionmaker(bind=db.create_engine(f"sqlite:///{args.db}"))()
+        counts = apply_changeset(session, changeset, old, new, abv.LanguageDict.from_csv(args.langs),
+                                 glottolog_path=args.glottolog)
+        print(f"{args.db}: {counts['languages']} languages changed, {counts['inserted']} units inserted, "
+              f"{counts['updated']} updated, {counts['deleted']} deleted, {counts['documents']} entry documents "
+              f"rebuilt", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+from __future__ import annotations
+import hashlib
+import json
+from dataclasses import asdict
+from enum import Enum
+from typing import *
+from libabaev2 import *
+from abaevmarkup import to_html
+
+# Materialized entry documents. Every entry and subentry is rendered once into a nested JSON document (numbered
+# senses with their groups, example groups with translations, forms with their variants and participles,
+# etymology citations), so that showing an entry is a single key lookup instead of joins at request time.
+# Documents are built per main entry from iter_entry_bundles; the hash of a bundle's source records tells whether
+# its documents have to be rebuilt.
+# Sense and example texts and mentioned forms are stored both raw, with their inline markup codes, and rendered to
+# HTML (see abaevmarkup).
+
+# Part of every bundle hash, so that changing what the documents contain rebuilds all of them
+DOCUMENT_FORMAT = "3"
+
+
+def record_dict(record) -> dict:
+    row = asdict(record)
+    for key, value in row.items():
+        if isinstance(value, Enum):
+            row[key] = value.value
+    return row
+
+
+def bundle_hash(bundle: EntryBundle) -> str:
+    digest = hashlib.sha1(DOCUMENT_FORMAT.encode())
+    for record in [bundle.entry] + [record for collection in COLLECTION_FILES if collection != "entries"
+                                    for record in getattr(bundle, collection).values()] + \
+            list(bundle.subentries.values()):
+        digest.update(repr(record).encode())
+    return digest.hexdigest()
+
+
+def form_tree(forms: FormDict) -> list[dict]:
+    children = {}
+    for form in forms.values():
+        children.setdefault(form.rel_of, []).append(form)
+
+    def node(form: Form) -> dict:
+        document = {"id": form.db_id, "orth": form.orth, "orth_cyr": form.orth_cyr, "lang": form.lang}
+        for child in children.get(form.db_id, []):
+            key = {FormRelType.VARIANT: "variants", FormRelType.PARTICIPLE: "participles"}.get(child.rel_type,
+                                                                                               "related")
+            document.setdefault(key, []).append(node(child))
+        return document
+
+    return [node(form) for form in children.get(None, [])]
+
+
+def sense_items(entry_id: str, bundle: EntryBundle) -> list[dict]:
+    # Ungrouped senses are items of their own, grouped senses are collected under their group in the order in which
+    # the group first appears
+    items = []
+    groups = {}
+    for sense in bundle.senses.values():
+        if sense.entry_id != entry_id:
+            continue
+        document = {"id": sense.db_id,
+                    "lang": sense.lang,
+                    "is_def": sense.is_def,
+                    "ru": sense.description_ru,
+                    "en": sense.description_en,
+                    "ru_html": to_html(sense.description_ru),
+                    "en_html": to_html(sense.description_en)}
+        if sense.sense_group is None:
+            document["type"] = "sense"
+            document["num"] = sense.num
+            items.append(document)
+            continue
+        if sense.sense_group not in groups:
+            group = bundle.sense_groups.get(sense.sense_group)
+            groups[sense.sense_group] = {"type": "group",
+                                         "id": sense.sense_group,
+                                         "num": group.num if group else sense.num,
+                                         "senses": []}
+            items.append(groups[sense.sense_group])
+        groups[sense.sense_group]["senses"].append(document)
+    return items
+
+
+def example_groups(entry_id: str, bundle: EntryBundle) -> list[dict]:
+    groups = {group.db_id: {"id": group.db_id, "num": group.num, "examples": []}
+              for group in bundle.example_groups.values() if group.entry_id == entry_id}
+    for example in bundle.examples.values():
+        if example.entry_id == entry_id and example.example_group in groups:
+            groups[example.example_group]["examples"].append({"id": example.db_id,
+                                                              "lang": example.lang,
+                                                              "text": example.text,
+                                                              "text_cyr": example.text_cyr,
+                                                              "ru": example.tr_ru,
+                                                              "en": example.tr_en,
+                                                              "text_html": to_html(example.text),
+                                                              "ru_html": to_html(example.tr_ru),
+                                                              "en_html": to_html(example.tr_en)})
+    return list(groups.values())
+
+
+def entry_document(entry: Entry, bundle: EntryBundle) -> dict:
+    document = {"id": entry.db_id,
+                "lemma": entry.lemma,
+                "lang": entry.lang,
+                "num": entry.num,
+                "main_entry": entry.main_entry or None,
+                "senses": sense_items(entry.db_id, bundle),
+                "examples": example_groups(entry.db_id, bundle)}
+    if entry is bundle.entry:
+        # Forms and etymologies are only extracted for main entries
+        document["forms"] = form_tree(bundle.forms)
+        document["etymology"] = [{**{k: v for k, v in record_dict(mentioned).items() if k != "entry_id"},
+                                  "form_html": [to_html(form) for form in mentioned.form or []]}
+                                 for mentioned in bundle.mentioneds.values()]
+        document["subentries"] = [{"id": subentry.db_id, "lemma": subentry.lemma, "num": subentry.num}
+                                  for subentry in bundle.subentries.values()]
+    return document
+
+
+def bundle_documents(bundle: EntryBundle) -> dict[str, str]:
+    # Serialized documents of the main entry and its subentries, keyed by entry id
+    return {entry.db_id: json.dumps(entry_document(entry, bundle), ensure_ascii=False, separators=(",", ":"))
+            for entry in [bundle.entry] + list(bundle.subentries.values())}
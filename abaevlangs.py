@@ -0,0 +1,119 @@
+from __future__ import annotations
+import os
+from typing import *
+from libabaev2 import LanguageDict
+
+# Language hierarchy with a precomputed closure.
+# Parents come from two sources: BCP-47-style subtags (os-x-iron and os-x-digor are children of os) and, if the
+# Glottolog submodule is available, the Glottolog classification of each language's glottocode. Glottolog nodes
+# that are the glottocode of a language in the LanguageDict are identified with its code (so that e.g. fa ends up
+# under ira); other Glottolog nodes are kept under their glottocode. The closure is computed once, after which
+# ancestor and descendant queries are set lookups.
+
+
+def tag_parent(code: str) -> Optional[str]:
+    subtags = code.split("-")
+    if len(subtags) < 2:
+        return None
+    subtags.pop()
+    # Drop the singleton that introduces a private-use or extension part (os-x-iron -> os)
+    while subtags and len(subtags[-1]) == 1:
+        subtags.pop()
+    return "-".join(subtags) if subtags else None
+
+
+class LanguageHierarchy:
+    def __init__(self, parents: dict[str, set[str]]):
+        self.parents = parents
+        self.ancestors: dict[str, frozenset[str]] = {}
+        self.depths: dict[Tuple[str, str], int] = {}  # (ancestor, descendant) -> shortest path length
+        for code in list(parents):
+            self.close(code, set())
+        children = {}
+        for code, ancestors in self.ancestors.items():
+            for ancestor in ancestors:
+                children.setdefault(ancestor, set()).add(code)
+        self.descendants: dict[str, frozenset[str]] = {code: frozenset(codes) for code, codes in children.items()}
+        self.families: dict[str, frozenset[str]] = {}
+
+    def close(self, code: str, visiting: set[str]) -> frozenset[str]:
+        if code in self.ancestors:
+            return self.ancestors[code]
+        visiting.add(code)
+        ancestors = set()
+        for parent in self.parents.get(code, ()):
+            if parent in visiting:  # Classification cycle, ignore the back edge
+                continue
+            ancestors.add(parent)
+            self.depths[parent, code] = 1
+            for ancestor in self.close(parent, visiting):
+                ancestors.add(ancestor)
+                depth = self.depths[ancestor, parent] + 1
+                if self.depths.get((ancestor, code), depth) >= depth:
+                    self.depths[ancestor, code] = depth
+        visiting.discard(code)
+        self.ancestors[code] = frozenset(ancestors)
+        return self.ancestors[code]
+
+    @classmethod
+    def from_language_dict(cls, langs: LanguageDict, codes: Iterable[str] = (),
+                           glottolog_path: str = None) -> LanguageHierarchy:
+        # codes: language codes used in the data but missing from the LanguageDict, e.g. from MentionedDict.langs
+        parents: dict[str, set[str]] = {}
+
+        def add(code: str):
+            while code is not None and code not in parents:
+                parents[code] = set()
+                parent = tag_parent(code)
+                if parent is not None:
+                    parents[code].add(parent)
+                code = parent
+
+        for code in langs:
+            add(code)
+        for code in codes:
+            add(code)
+
+        if glottolog_path and os.path.isdir(os.path.join(glottolog_path, "languoids")):
+            from pyglottolog import Glottolog
+            glottolog = Glottolog(glottolog_path)
+            by_glottocode = {}
+            for code in sorted(langs, key=lambda c: (len(c), c)):
+                if langs[code].glottocode:
+                    by_glottocode.setdefault(langs[code].glottocode, code)
+            for code in langs:
+                glottocode = langs[code].glottocode
+                languoid = glottolog.languoid(glottocode) if glottocode else None
+                if languoid is None:
+                    continue
+                # lineage runs from the top-level family down to the immediate parent
+                lineage = [by_glottocode.get(ancestor_id, ancestor_id) for _, ancestor_id, _ in languoid.lineage]
+                chain = lineage + [code]
+                for parent, child in zip(chain, chain[1:]):
+                    if parent != child:
+                        parents.setdefault(parent, set())
+                        parents.setdefault(child, set()).add(parent)
+        return cls(parents)
+
+    def ancestors_of(self, code: str) -> frozenset[str]:
+        return self.ancestors.get(code, frozenset())
+
+    def descendants_of(self, code: str) -> frozenset[str]:
+        return self.descendants.get(code, frozenset())
+
+    def family(self, code: str) -> frozenset[str]:
+        # The language itself and everything below it, e.g. family("os") replaces
+        # lang == "os" or lang.startswith("os-")
+        if code not in self.families:
+            self.families[code] = self.descendants_of(code) | {code}
+        return self.families[code]
+
+    def is_a(self, code: str, ancestor: str) -> bool:
+        return code == ancestor or ancestor in self.ancestors_of(code)
+
+    def closure_rows(self) -> Iterator[Tuple[str, str, int]]:
+        # (ancestor, descendant, depth) rows of the closure table, including depth 0 rows for every node
+        for code in self.ancestors:
+            yield code, code, 0
+        for (ancestor, descendant), depth in self.depths.items():
+            yield ancestor, descendant, depth
@@ -0,0 +1,130 @@
+from __future__ import annotations
+import html
+import re
+from typing import *
+from libabaev2 import *
+
+# Inline markup codes in the text of examples, senses and mentioned forms, as typed in the TEI sources: %s…%s is
+# spaced (letter-spaced emphasis in the printed dictionary, used for the word being glossed), %b…%b bold, %i…%i
+# italic, %r…%r raised (superscript letters of reconstructed and Iranian forms, x%rə%rrani) and %u…%u underlined
+# (s̱ in iɣā%us%ue), and %n a line break. The remaining %-sequences (%t, %d, %S, %l, %,) are typos in the sources
+# and are kept as text.
+# A text is parsed once, by splitting on a compiled expression of the codes, into a tuple of (style, text) tokens,
+# style being a bit set of the codes open at that point; a code toggles its bit, so nested and unclosed codes need no
+# special handling. Tokens are rendered to HTML or plain text, and the renderer caches its output by raw text, since
+# the same glosses recur across entries.
+
+SPACED = 1
+BOLD = 2
+ITALIC = 4
+RAISED = 8
+UNDERLINED = 16
+STYLES = {"s": SPACED, "b": BOLD, "i": ITALIC, "r": RAISED, "u": UNDERLINED}
+LINE_BREAK = "n"
+CODES = re.compile(r"%([sbinru])")
+# Plain text keeps underlining as a combining macron below each character, as in the usual transcription
+MACRON_BELOW = "\u0331"
+# Characters that make the HTML of a text differ from the text
+HTML_SPECIAL = re.compile(r"[%&<>\n]")
+# HTML tags of each style, outermost first
+HTML_TAGS = [(SPACED, '<span class="spaced">', "</span>"), (BOLD, "<b>", "</b>"), (ITALIC, "<i>", "</i>"),
+             (RAISED, "<sup>", "</sup>"), (UNDERLINED, "<u>", "</u>")]
+
+Tokens = tuple[tuple[int, str], ...]
+
+
+def parse(text: str) -> Tokens:
+    tokens = []
+    style = 0
+    for i, part in enumerate(CODES.split(text)):
+        if i % 2:
+            if part == LINE_BREAK:
+                part = "\n"
+            else:
+                style ^= STYLES[part]
+                continue
+        if not part:
+            continue
+        if tokens and tokens[-1][0] == style:
+            tokens[-1] = (style, tokens[-1][1] + part)
+        else:
+            tokens.append((style, part))
+    return tuple(tokens)
+
+
+def tokens_html(tokens: Tokens) -> str:
+    output = []
+    for style, text in tokens:
+        text = html.escape(text, quote=False).replace("\n", "<br>")
+        if style:
+            text = "".join(open_tag for bit, open_tag, _ in HTML_TAGS if style & bit) + text + \
+                   "".join(close_tag for bit, _, close_tag in reversed(HTML_TAGS) if style & bit)
+        output.append(text)
+    return "".join(output)
+
+
+def tokens_plain(tokens: Tokens) -> str:
+    return "".join("".join(ch + MACRON_BELOW for ch in text) if style & UNDERLINED else text
+                   for style, text in tokens)
+
+
+class MarkupRenderer:
+    def __init__(self):
+        self.tokens: dict[str, Tokens] = {}
+        self.html_cache: dict[str, str] = {}
+        self.plain_cache: dict[str, str] = {}
+
+    def parse(self, text: str) -> Tokens:
+        tokens = self.tokens.get(text)
+        if tokens is None:
+            tokens = self.tokens[text] = parse(text)
+        return tokens
+
+    def html(self, text: Optional[str]) -> Optional[str]:
+        if text is None:
+            return None
+        rendered = self.html_cache.get(text)
+        if rendered is None:
+            # Most texts have no codes and nothing to escape, and are their own HTML
+            rendered = text if HTML_SPECIAL.search(text) is None else tokens_html(self.parse(text))
+            self.html_cache[text] = rendered
+        return rendered
+
+    def plain(self, text: Optional[str]) -> Optional[str]:
+        if text is None or "%" not in text:
+            return text
+        rendered = self.plain_cache.get(text)
+        if rendered is None:
+            rendered = self.plain_cache[text] = tokens_plain(self.parse(text))
+        return rendered
+
+    def clear(self):
+        self.tokens.clear()
+        self.html_cache.clear()
+        self.plain_cache.clear()
+
+
+RENDERER = MarkupRenderer()
+
+
+def to_html(text: Optional[str]) -> Optional[str]:
+    return RENDERER.html(text)
+
+
+def to_plain(text: Optional[str]) -> Optional[str]:
+    return RENDERER.plain(text)
+
+
+def render_examples(examples: ExampleDict, output: str = "html",
+                    renderer: MarkupRenderer = RENDERER) -> dict[str, tuple[str, str, str]]:
+    # (text, tr_ru, tr_en) of every example rendered to "html" or "plain", by example id
+    render = getattr(renderer, output)
+    return {db_id: (render(example.text), render(example.tr_ru), render(example.tr_en))
+            for db_id, example in examples.items()}
+
+
+def render_senses(senses: SenseDict, output: str = "html",
+                  renderer: MarkupRenderer = RENDERER) -> dict[str, tuple[str, str]]:
+    # (description_ru, description_en) of every sense, by sense id
+    render = getattr(renderer, output)
+    return {db_id: (render(sense.description_ru), render(sense.description_en)) for db_id, sense in senses.items()}
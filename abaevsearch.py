@@ -0,0 +1,139 @@
+from __future__ import annotations
+import unicodedata
+from dataclasses import dataclass
+from typing import *
+from libabaev2 import EntryDict, FormDict, abaev_key
+
+# Approximate lemma search over Entry.lemma and Form.orth.
+# Every string is reduced to a search key: abaev_key folded further (no case, no combining marks, no ejective or
+# labialization marks, so that cʼ ~ c and k˳ ~ k0 ~ k). The keys are split into padded character trigrams and
+# stored in an inverted index. A query collects candidates that share trigrams with it and ranks them by edit
+# distance between keys.
+
+GRAM_SIZE = 3
+PAD = "\x02"
+FOLDED_MARKS = str.maketrans('', '', "ʼ'’˳ʷ")
+
+
+def search_key(string: str) -> str:
+    # Lowercased before abaev_key, whose output uses upper case letters as collation codes of their own (H for l)
+    string = unicodedata.normalize("NFC", " ".join(string.split())).translate(FOLDED_MARKS).lower()
+    if string == '':
+        return ''
+    key = unicodedata.normalize("NFD", abaev_key(string))
+    return "".join(ch for ch in key if not unicodedata.combining(ch) and not ch.isspace())
+
+
+def key_grams(key: str) -> set[str]:
+    padded = PAD * (GRAM_SIZE - 1) + key + PAD * (GRAM_SIZE - 1)
+    return {padded[i:i + GRAM_SIZE] for i in range(len(padded) - GRAM_SIZE + 1)}
+
+
+def edit_distance(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ch_a in enumerate(a, 1):
+        current = [i]
+        for j, ch_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1,
+                               current[j - 1] + 1,
+                               previous[j - 1] + (ch_a != ch_b)))
+        previous = current
+    return previous[-1]
+
+
+@dataclass
+class LemmaRecord:
+    db_id: str  # db_id of the entry or form
+    entry_id: str  # Entry the lemma or form belongs to
+    text: str  # Lemma or orth as it appears in the data
+    lang: str = None
+    is_form: bool = False  # True if the record comes from FormDict
+
+
+@dataclass
+class LemmaMatch:
+    record: LemmaRecord
+    score: float  # 1.0 for identical search keys, down to 0.0
+
+
+class LemmaIndex:
+    def __init__(self):
+        self.keys: list[str] = []  # Distinct search keys, position is the key id
+        self.records: list[list[LemmaRecord]] = []  # Records sharing the key with the same id
+        self.key_ids: dict[str, int] = {}
+        self.postings: dict[str, list[int]] = {}
+
+    @classmethod
+    def from_dicts(cls, entries: EntryDict, forms: FormDict = None) -> LemmaIndex:
+        index = cls()
+        for entry in entries.values():
+            index.add(LemmaRecord(db_id=entry.db_id,
+                                  entry_id=entry.db_id,
+                                  text=entry.lemma,
+                                  lang=entry.lang))
+        if forms:
+            for form in forms.values():
+                index.add(LemmaRecord(db_id=form.db_id,
+                                      entry_id=form.entry_id,
+                                      text=form.orth,
+                                      lang=form.lang,
+                                      is_form=True))
+        return index
+
+    def add(self, record: LemmaRecord):
+        if not record.text:
+            return
+        key = search_key(record.text)
+        if key == '':
+            return
+        key_id = self.key_ids.get(key)
+        if key_id is None:
+            key_id = len(self.keys)
+            self.key_ids[key] = key_id
+            self.keys.append(key)
+            self.records.append([])
+            for gram in key_grams(key):
+                self.postings.setdefault(gram, []).append(key_id)
+        self.records[key_id].append(record)
+
+    def __len__(self):
+        return sum(len(records) for records in self.records)
+
+    def search(self, query: str, k: int = 10, min_score: float = 0.0,
+               candidates: int = 50) -> list[LemmaMatch]:
+        key = search_key(query)
+        if key == '':
+            return []
+
+        scored: list[tuple[float, int]] = []
+        exact_id = self.key_ids.get(key)
+        if exact_id is not None:
+            scored.append((1.0, exact_id))
+
+        # Count shared trigrams, then rank only the best candidates by edit distance
+        shared: dict[int, int] = {}
+        for gram in key_grams(key):
+            for key_id in self.postings.get(gram, ()):
+                shared[key_id] = shared.get(key_id, 0) + 1
+        shared.pop(exact_id, None)
+        best = sorted(shared, key=shared.__getitem__, reverse=True)[:candidates]
+        for key_id in best:
+            other = self.keys[key_id]
+            score = 1.0 - edit_distance(key, other) / max(len(key), len(other))
+            if score >= min_score:
+                scored.append((score, key_id))
+
+        # One match per entry, the best of its lemma and forms
+        scored.sort(key=lambda item: (-item[0], self.keys[item[1]]))
+        matches = []
+        seen = set()
+        for score, key_id in scored:
+            for record in self.records[key_id]:
+                if record.entry_id not in seen:
+                    seen.add(record.entry_id)
+                    matches.append(LemmaMatch(record=record, score=score))
+            if len(matches) >= k:
+                break
+        return matches[:k]
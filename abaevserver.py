@@ -0,0 +1,258 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import zlib
+from collections import OrderedDict
+from dataclasses import asdict
+from enum import Enum
+from typing import *
+from urllib.parse import unquote
+import libabaev2 as abv
+
+# Read-only HTTP/JSON lookup server over the generated CSV files.
+# The dictionary is loaded once into a snapshot; the snapshot version (a hash of the CSV sizes and mtimes) is used
+# in ETags, and a watcher reloads the snapshot in the background when the files change. Requests are answered from
+# the old snapshot until the new one is ready.
+#
+# Routes (all GET):
+#   /entry/<id>              entry with its forms, subentries, sense groups and example groups
+#   /entry/<id>/senses       senses of the entry
+#   /entry/<id>/examples     examples of the entry
+#   /entry/<id>/etymology    mentioned forms of the entry
+#   /sense/<id>, /example/<id>, /mentioned/<id>, /language/<code>
+#   /version                 snapshot version and record counts
+
+log = logging.getLogger("abaevserver")
+
+
+def to_json(obj) -> object:
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, dict):
+        return {k: to_json(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [to_json(v) for v in obj]
+    if hasattr(obj, "__dataclass_fields__"):
+        return to_json(asdict(obj))
+    return obj
+
+
+def group_by_entry(records: dict[str, object]) -> dict[str, list]:
+    grouped = {}
+    for record in records.values():
+        grouped.setdefault(record.entry_id, []).append(record)
+    return grouped
+
+
+def snapshot_signature(paths: list[str]) -> str:
+    digest = hashlib.sha1()
+    for path in paths:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        else:
+            digest.update(f"{path}:missing;".encode())
+    return digest.hexdigest()[:16]
+
+
+class Snapshot:
+    def __init__(self, csv_dir: str, langs_file: str = None):
+        self.csv_dir = csv_dir
+        self.langs_file = langs_file
+        self.version = snapshot_signature(self.paths())
+
+        self.entries = abv.get_entries_from_csv(self.path("entries"))
+        self.forms = abv.get_forms_from_csv(self.path("forms"))
+        self.senses = abv.get_senses_from_csv(self.path("senses"))
+        self.sense_groups = abv.get_sense_groups_from_csv(self.path("sense_groups"))
+        self.examples = abv.get_examples_from_csv(self.path("examples"))
+        self.example_groups = abv.get_example_groups_from_csv(self.path("example_groups"))
+        self.mentioneds = abv.get_mentioneds_from_csv(self.path("mentioneds"))
+        self.langs = abv.LanguageDict()
+        if langs_file and os.path.exists(langs_file):
+            self.langs = abv.LanguageDict.from_csv(langs_file)
+
+        self.forms_by_entry = group_by_entry(self.forms)
+        self.senses_by_entry = group_by_entry(self.senses)
+        self.sense_groups_by_entry = group_by_entry(self.sense_groups)
+        self.examples_by_entry = group_by_entry(self.examples)
+        self.example_groups_by_entry = group_by_entry(self.example_groups)
+        self.mentioneds_by_entry = group_by_entry(self.mentioneds)
+        self.subentries = {}
+        for entry in self.entries.values():
+            if entry.main_entry:
+                self.subentries.setdefault(entry.main_entry, []).append(entry.db_id)
+
+    def path(self, name: str) -> str:
+        return abv.find_file(os.path.join(self.csv_dir, abv.COLLECTION_FILES[name] + ".csv"))
+
+    def paths(self) -> list[str]:
+        paths = [self.path(name) for name in abv.COLLECTION_FILES]
+        if self.langs_file:
+            paths.append(self.langs_file)
+        return paths
+
+    def lookup(self, path: str) -> Optional[object]:
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        if parts == ["version"]:
+            return {"version": self.version,
+                    "counts": {name: len(getattr(self, name)) for name in abv.COLLECTION_FILES}}
+        if len(parts) == 2:
+            kind, key = parts
+            if kind == "entry" and key in self.entries:
+                entry = self.entries[key]
+                return {"entry": entry,
+                        "forms": self.forms_by_entry.get(key, []),
+                        "subentries": self.subentries.get(key, []),
+                        "sense_groups": self.sense_groups_by_entry.get(key, []),
+                        "example_groups": self.example_groups_by_entry.get(key, [])}
+            collection = {"sense": self.senses,
+                          "example": self.examples,
+                          "mentioned": self.mentioneds,
+                          "language": self.langs}.get(kind)
+            if collection is not None and key in collection:
+                return collection[key]
+        if len(parts) == 3 and parts[0] == "entry" and parts[1] in self.entries:
+            grouped = {"senses": self.senses_by_entry,
+                       "examples": self.examples_by_entry,
+                       "etymology": self.mentioneds_by_entry}.get(parts[2])
+            if grouped is not None:
+                return grouped.get(parts[1], [])
+        return None
+
+
+class LookupServer:
+    def __init__(self, csv_dir: str, langs_file: str = None, cache_size: int = 4096,
+                 reload_interval: float = 2.0):
+        self.csv_dir = csv_dir
+        self.langs_file = langs_file
+        self.cache_size = cache_size
+        self.reload_interval = reload_interval
+        self.snapshot = Snapshot(csv_dir, langs_file)
+        self.cache: OrderedDict[str, tuple[bytes, str]] = OrderedDict()
+
+    def response(self, path: str) -> Optional[tuple[bytes, str]]:
+        cached = self.cache.get(path)
+        if cached is not None:
+            self.cache.move_to_end(path)
+            return cached
+        snapshot = self.snapshot
+        result = snapshot.lookup(path)
+        if result is None:
+            return None
+        body = json.dumps(to_json(result), ensure_ascii=False).encode()
+        etag = f'"{snapshot.version}-{zlib.crc32(body):08x}"'
+        if snapshot is self.snapshot:
+            self.cache[path] = (body, etag)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return body, etag
+
+    async def watch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            if snapshot_signature(self.snapshot.paths()) == self.snapshot.version:
+                continue
+            try:
+                snapshot = await loop.run_in_executor(None, Snapshot, self.csv_dir, self.langs_file)
+            except Exception:
+                # Files may be half-written, keep serving the old snapshot and retry on the next tick
+                log.exception("reload failed, keeping snapshot %s", self.snapshot.version)
+                continue
+            self.snapshot = snapshot
+            self.cache.clear()
+            log.info("reloaded snapshot %s", snapshot.version)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                parts = request_line.decode("latin-1").split()
+                if len(parts) != 3:
+                    self.write(writer, 400, b'{"error": "bad request"}')
+                    break
+                method, target, version = parts
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+                if method not in ("GET", "HEAD"):
+                    self.write(writer, 405, b'{"error": "method not allowed"}', keep_alive=keep_alive)
+                else:
+                    found = self.response(target.split("?")[0])
+                    if found is None:
+                        self.write(writer, 404, b'{"error": "not found"}', keep_alive=keep_alive,
+                                   head_only=method == "HEAD")
+                    elif headers.get("if-none-match") == found[1]:
+                        self.write(writer, 304, b'', etag=found[1], keep_alive=keep_alive)
+                    else:
+                        self.write(writer, 200, found[0], etag=found[1], keep_alive=keep_alive,
+                                   head_only=method == "HEAD")
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def write(writer: asyncio.StreamWriter, status: int, body: bytes, etag: str = None, keep_alive: bool = False,
+              head_only: bool = False):
+        # A HEAD response has the headers of the GET response, Content-Length included, and no body
+        reasons = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+        head = [f"HTTP/1.1 {status} {reasons[status]}",
+                "Content-Type: application/json; charset=utf-8",
+                f"Content-Length: {len(body)}",
+                "Connection: " + ("keep-alive" if keep_alive else "close")]
+        if etag:
+            head.append(f"ETag: {etag}")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + (b'' if head_only else body))
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle, host, port)
+        watcher = asyncio.create_task(self.watch())
+        log.info("serving snapshot %s on %s:%d", self.snapshot.version, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Read-only JSON lookup server over the Abaev CSV files")
+    parser.add_argument("--csv-dir", default="csv")
+    parser.add_argument("--langs", default="../abaev-tei-oxygen/css/langnames.csv")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--cache-size", type=int, default=4096)
+    parser.add_argument("--reload-interval", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    server = LookupServer(csv_dir=args.csv_dir,
+                          langs_file=args.langs,
+                          cache_size=args.cache_size,
+                          reload_interval=args.reload_interval)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+from __future__ import annotations
+import bisect
+import csv
+import os
+import re
+from dataclasses import dataclass
+from typing import *
+from libabaev2 import NAMESPACES, XML_ID, DictionaryMerger, find_file, open_file
+
+# Index from xml:id to the TEI source of every element that has one (entries, subentries, forms, senses, examples,
+# mentioned forms, ...). It is built during extraction from the raw bytes of each file and stores, per id, the file,
+# the line of the start tag and the byte span of the element, so that the source of a record is read back by
+# slicing the file and parsing only that fragment. Offsets of compressed files are offsets in the decompressed data.
+# When files share ids, each record's span is taken from the file that the DictionaryMerger kept it from.
+
+INDEX_FIELDS = ["xml_id", "file", "line", "start", "end"]
+# Namespace declarations for parsing a fragment cut out of its document; the TEI files declare these on the root
+FRAGMENT_START = ('<fragment xmlns="' + NAMESPACES["tei"] + '" xmlns:abv="' + NAMESPACES["abv"] + '">').encode()
+FRAGMENT_END = b"</fragment>"
+# Rest of a start or end tag after its name: attributes (quoted values may contain >) and the closing / of empty tags
+TAG_REST = rb"""(?=[\s/>])(?:[^>"']|"[^"]*"|'[^']*')*?(/?)>"""
+
+
+@dataclass
+class SourceSpan:
+    file: str
+    line: int
+    start: int  # Byte offset of the start tag
+    end: int  # Byte offset after the end tag
+
+
+def raw_name(element) -> bytes:
+    from lxml import etree
+    localname = etree.QName(element).localname
+    return (f"{element.prefix}:{localname}" if element.prefix else localname).encode()
+
+
+def element_spans(data: bytes, tree) -> dict[str, tuple[int, int, int]]:
+    # (line, start, end) of every element with an xml:id. lxml only knows the line on which the start tag of each
+    # element ends, so its xml:id attribute is searched backwards from the end of that line, the start tag backwards
+    # from the attribute (attribute values cannot contain <), and the end by counting start and end tags of the same
+    # name from there.
+    from lxml import etree
+    line_starts = [0] + [match.end() for match in re.finditer(b"\n", data)]
+    spans = {}
+    tag_patterns = {}
+    for element in tree.iter(tag=etree.Element):
+        xml_id = element.get(XML_ID)
+        if xml_id is None or not element.sourceline:
+            continue
+        line_end = line_starts[element.sourceline] if element.sourceline < len(line_starts) else len(data)
+        encoded = xml_id.encode()
+        position = data.rfind(b'xml:id="' + encoded + b'"', 0, line_end)
+        if position < 0:
+            position = data.rfind(b"xml:id='" + encoded + b"'", 0, line_end)
+        if position < 0:
+            continue
+        name = raw_name(element)
+        start = data.rfind(b"<" + name, 0, position)
+        assert start >= 0, f"no start tag for {xml_id}"
+        if name not in tag_patterns:
+            tag_patterns[name] = re.compile(b"<(/?)" + re.escape(name) + TAG_REST)
+        depth = 0
+        for match in tag_patterns[name].finditer(data, start):
+            closing, empty = match.group(1), match.group(2)
+            if not closing and not empty:
+                depth += 1
+            elif closing:
+                depth -= 1
+            if depth == 0:
+                spans[xml_id] = (bisect.bisect_right(line_starts, start), start, match.end())
+                break
+    return spans
+
+
+class SourceIndex:
+    def __init__(self):
+        self.spans: dict[str, tuple[str, int, int, int]] = {}
+
+    def add_file(self, filename: str, data: bytes, tree):
+        for xml_id, (line, start, end) in element_spans(data, tree).items():
+            self.spans[xml_id] = (filename, line, start, end)
+
+    @classmethod
+    def from_merger(cls, merger: DictionaryMerger, file_spans: dict[str, dict[str, tuple[int, int, int]]]) -> \
+            SourceIndex:
+        # Index of merged data, from the element_spans of every file. Each record points into the file that the merger
+        # took it from, under its id after renaming; ids that are not records (and the other xml ids of mentioned
+        # forms) point into the last file that has them.
+        index = cls()
+        for filename, spans in file_spans.items():
+            for xml_id, span in spans.items():
+                index.spans[xml_id] = (filename,) + span
+        for name, records in merger.collections.items():
+            for db_id, record in records.items():
+                filename = records.source(db_id)[0]
+                spans = file_spans.get(filename, {})
+                for xml_id in [db_id] + [xml_id for xml_id in getattr(record, "xml_id", None) or [] if xml_id != db_id]:
+                    span = spans.get(merger.original_id(xml_id))
+                    if span is not None:
+                        index.spans[xml_id] = (filename,) + span
+        return index
+
+    def __len__(self):
+        return len(self.spans)
+
+    def __contains__(self, xml_id: str):
+        return xml_id in self.spans
+
+    def lookup(self, xml_id: str) -> Optional[SourceSpan]:
+        span = self.spans.get(xml_id)
+        return SourceSpan(*span) if span else None
+
+    def write(self, filename: str):
+        with open_file(filename, "w") as file:
+            csv_writer = csv.writer(file, delimiter=",")
+            csv_writer.writerow(INDEX_FIELDS)
+            for xml_id, span in self.spans.items():
+                csv_writer.writerow((xml_id,) + span)
+
+    @classmethod
+    def read(cls, filename: str) -> SourceIndex:
+        index = cls()
+        with open_file(filename, "r") as file:
+            csv_reader = csv.reader(file, delimiter=",")
+            next(csv_reader)
+            for xml_id, source, line, start, end in csv_reader:
+                index.spans[xml_id] = (source, int(line), int(start), int(end))
+        return index
+
+
+class SourceReader:
+    def __init__(self, index: SourceIndex, directory: str = "../abaevdict-tei/entries"):
+        self.index = index
+        self.directory = directory
+
+    def fragment(self, xml_id: str) -> Optional[bytes]:
+        # Raw bytes of the element as written in the source file
+        span = self.index.lookup(xml_id)
+        if span is None:
+            return None
+        path = os.path.join(self.directory, span.file)
+        if path.endswith(".xml"):
+            with open(path, "rb") as file:
+                file.seek(span.start)
+                return file.read(span.end - span.start)
+        with open_file(find_file(path), "rb") as file:
+            return file.read(span.end)[span.start:]
+
+    def element(self, xml_id: str):
+        from lxml import etree
+        fragment = self.fragment(xml_id)
+        if fragment is None:
+            return None
+        return etree.fromstring(FRAGMENT_START + fragment + FRAGMENT_END)[0]
+
+    def location(self, xml_id: str) -> Optional[str]:
+        span = self.index.lookup(xml_id)
+        return f"{os.path.join(self.directory, span.file)}:{span.line}" if span else None
@@ -0,0 +1,116 @@
+from __future__ import annotations
+from typing import *
+import numpy as np
+import scipy.sparse as sp
+from libabaev2 import *
+from abaevlangs import LanguageHierarchy
+
+# Language-contact statistics over the etymologies.
+# Entries and languages are numbered once, and the languages cited by each entry's mentioned forms are stored as a
+# sparse entry x language incidence matrix (1 if any mentioned form of the entry cites the language). Counts,
+# co-occurrence and breakdowns by entry language are then sparse matrix products and column sums instead of nested
+# loops over MentionedDict.
+
+
+class ContactMatrix:
+    def __init__(self, entry_ids: list[str], entry_langs: list[str], lang_codes: list[str],
+                 rows: np.ndarray, columns: np.ndarray):
+        self.entry_ids = entry_ids
+        self.lang_codes = lang_codes
+        self.lang_index = {code: i for i, code in enumerate(lang_codes)}
+        # Mention counts per entry and language, and the 0/1 incidence derived from them
+        self.mentions = sp.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, columns)),
+                                      shape=(len(entry_ids), len(lang_codes)))
+        self.mentions.sum_duplicates()
+        self.incidence = self.mentions.copy()
+        self.incidence.data[:] = 1
+        # Entry languages are numbered separately, as most of them never occur among the cited languages
+        self.entry_lang_codes = sorted(set(entry_langs))
+        entry_lang_index = {code: i for i, code in enumerate(self.entry_lang_codes)}
+        self.entry_lang = np.array([entry_lang_index[code] for code in entry_langs], dtype=np.int32)
+        self._cooccurrence = None
+
+    @classmethod
+    def from_dicts(cls, entries: EntryDict, mentioneds: MentionedDict) -> ContactMatrix:
+        # Subentries have no mentioned forms of their own, so only main entries are rows
+        entry_ids = [entry.db_id for entry in entries.values() if not entry.main_entry]
+        entry_index = {db_id: i for i, db_id in enumerate(entry_ids)}
+        lang_index = {}
+        rows, columns = [], []
+        for mentioned in mentioneds.values():
+            row = entry_index.get(mentioned.entry_id)
+            if row is None:
+                continue
+            for lang in mentioned.langs or []:
+                rows.append(row)
+                columns.append(lang_index.setdefault(lang, len(lang_index)))
+        return cls(entry_ids=entry_ids,
+                   entry_langs=[entries[db_id].lang or "" for db_id in entry_ids],
+                   lang_codes=list(lang_index),
+                   rows=np.array(rows, dtype=np.int32),
+                   columns=np.array(columns, dtype=np.int32))
+
+    def columns(self, codes: Iterable[str]) -> np.ndarray:
+        return np.array(sorted(self.lang_index[code] for code in codes if code in self.lang_index), dtype=np.int32)
+
+    def ranked(self, counts: np.ndarray, columns: np.ndarray = None, k: int = None) -> list[tuple[str, int]]:
+        # Languages with nonzero counts, most frequent first; ties are broken by code for stable output
+        if columns is None:
+            columns = np.arange(len(self.lang_codes))
+        selected = counts[columns]
+        keep = selected > 0
+        columns, selected = columns[keep], selected[keep]
+        if k is not None and len(columns) > k:
+            top = np.argpartition(-selected, k - 1)[:k]
+            columns, selected = columns[top], selected[top]
+        return sorted(((self.lang_codes[c], int(n)) for c, n in zip(columns, selected)), key=lambda x: (-x[1], x[0]))
+
+    def entry_counts(self) -> np.ndarray:
+        # Number of entries citing each language
+        return np.asarray(self.incidence.sum(axis=0)).ravel()
+
+    def mention_counts(self) -> np.ndarray:
+        return np.asarray(self.mentions.sum(axis=0)).ravel()
+
+    def language_counts(self, k: int = None) -> list[tuple[str, int]]:
+        return self.ranked(self.entry_counts(), k=k)
+
+    def cooccurrence(self) -> sp.csr_matrix:
+        # Language x language matrix of the number of entries citing both; the diagonal is entry_counts
+        if self._cooccurrence is None:
+            self._cooccurrence = (self.incidence.T @ self.incidence).tocsr()
+        return self._cooccurrence
+
+    def cooccurring(self, code: str, k: int = 10) -> list[tuple[str, int]]:
+        if code not in self.lang_index:
+            return []
+        i = self.lang_index[code]
+        counts = self.cooccurrence().getrow(i).toarray().ravel()
+        counts[i] = 0
+        return self.ranked(counts, k=k)
+
+    def top_by_family(self, hierarchy: LanguageHierarchy, families: Iterable[str], k: int = 10) \
+            -> dict[str, list[tuple[str, int]]]:
+        # Most cited languages within each family, e.g. top_by_family(hierarchy, ["ira", "cauc"])
+        counts = self.entry_counts()
+        return {family: self.ranked(counts, self.columns(hierarchy.family(family)), k) for family in families}
+
+    def family_entry_counts(self, hierarchy: LanguageHierarchy, families: Iterable[str]) -> dict[str, int]:
+        # Number of entries citing at least one language of each family
+        return {family: int(self.incidence[:, self.columns(hierarchy.family(family))].getnnz(axis=1).astype(bool)
+                            .sum())
+                for family in families}
+
+    def by_entry_language(self) -> sp.csr_matrix:
+        # Entry language x cited language matrix of the number of entries, rows in entry_lang_codes order
+        indicator = sp.csr_matrix((np.ones(len(self.entry_lang), dtype=np.int32),
+                                   (self.entry_lang, np.arange(len(self.entry_lang)))),
+                                  shape=(len(self.entry_lang_codes), len(self.entry_lang)))
+        return (indicator @ self.incidence).tocsr()
+
+    def breakdown(self, code: str) -> dict[str, int]:
+        # Number of entries citing the language, per entry language
+        if code not in self.lang_index:
+            return {}
+        column = self.by_entry_language().getcol(self.lang_index[code]).toarray().ravel()
+        return {self.entry_lang_codes[i]: int(n) for i, n in enumerate(column) if n}
@@ -0,0 +1,360 @@
+from __future__ import annotations
+import argparse
+import os
+import sys
+
+# Command line entry point for the Abaev dictionary tools: abaevtools.py <command> [options]
+# Only argparse is imported at startup. Each command imports what it needs (lxml, SQLAlchemy, pyglottolog, folium,
+# ...) when it runs, so --help and the CSV-only commands do not pay for the rest of the stack.
+# gen-csv.py, sqlite-from-csv.py, fillcoords.py and tests.py are kept as wrappers around the extract, load-db,
+# fill-coords and map commands.
+
+LANGS = "../abaev-tei-oxygen/css/langnames.csv"
+ENTRIES_DIR = "../abaevdict-tei/entries"
+GLOTTOLOG = "./glottolog"
+
+# Kept literal so that building the parser does not import libabaev2; they match DuplicatePolicy, BACKENDS and
+# COMPRESSIONS there
+DUPLICATE_POLICIES = ["strict", "warn", "rename"]
+FORMATS = ["csv", "parquet", "feather"]
+COMPRESSED = ["gz", "xz", "zst"]
+
+ENTRY_FILE = r'abaev_[78]?[AaÆæBbCcDdƷʒEeFfGgǴǵǦǧIiĪīJjKkḰḱLlMmNnOoPpQqRr]'
+
+
+def read_csv_dir(directory: str):
+    from libabaev2 import CsvBackend
+    return CsvBackend().read(directory)
+
+
+def extract(args):
+    import re
+    from lxml import etree
+    from libabaev2 import COMPRESSIONS, NAMESPACES, DictionaryData, DictionaryMerger, DuplicatePolicy, get_backend, \
+        get_dict_info, open_file, source_lines
+    from abaevcyr import transliterate_examples, transliterate_forms
+    from abaevsource import SourceIndex, element_spans
+    if args.engine == "walk":
+        from abaevwalk import walk_dict_info as extract_info
+    else:
+        extract_info = get_dict_info
+
+    merger = DictionaryMerger(policy=DuplicatePolicy(args.duplicates))
+    file_spans = {}
+    for file in os.listdir(args.entries_dir):
+        if file.endswith(tuple([".xml"] + [".xml" + extension for extension in COMPRESSIONS])) and \
+                not (file.startswith("abaev_!")) and re.match(ENTRY_FILE, file):
+            with open_file(os.path.join(args.entries_dir, file), "rb") as entry_file:
+                data = entry_file.read()
+            tree = etree.ElementTree(etree.fromstring(data))
+            file_spans[file] = element_spans(data, tree)
+            node = tree.xpath("//tei:entry", namespaces=NAMESPACES)[0]
+            merger.add(filename=file,
+                       infos=extract_info(node=node),
+                       lines=source_lines(tree))
+
+    entries, forms, sense_groups, senses, example_groups, examples, mentioneds = merger.results()
+
+    # Add missing languages to (sub)entries
+    for entry in entries.values():
+        if entry.lang is None:
+            if entry.main_entry is not None:
+                entry.lang = entries[entry.main_entry].lang
+            else:
+                entry.lang = 'os'
+
+    # Add missing languages to forms
+    for form in forms.values():
+        if form.lang is None:
+            if form.rel_of is None:
+                form.lang = entries[form.entry_id].lang
+            else:
+                form.lang = forms[form.rel_of].lang
+
+    # Add missing languages to senses
+    for sense in senses.values():
+        if sense.lang is None:
+            sense.lang = entries[sense.entry_id].lang
+
+    # Add missing languages to examples
+    for ex in examples.values():
+        if ex.lang is None:
+            entry = entries[ex.entry_id]
+            if entry.lang == 'os':
+                ex.lang = 'os-x-iron'
+            else:
+                ex.lang = entry.lang
+
+    # Cyrillic spellings of Ossetic forms and examples, stored as extra columns
+    transliterate_forms(forms)
+    transliterate_examples(examples)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    backend = get_backend(args.format, compression=args.compress)
+    backend.write(DictionaryData(entries=entries,
+                                 forms=forms,
+                                 senses=senses,
+                                 sense_groups=sense_groups,
+                                 examples=examples,
+                                 example_groups=example_groups,
+                                 mentioneds=mentioneds), args.output_dir)
+    # xml:id -> file and byte span index for reading the TEI source of a record back, see abaevsource
+    SourceIndex.from_merger(merger, file_spans).write(
+        os.path.join(args.output_dir, "sources.csv" + ("." + args.compress if args.compress else "")))
+
+
+def load_db(args):
+    import sqlalchemy as db
+    import sqlalchemy_utils as db_utils
+    from sqlalchemy.orm import sessionmaker
+    from libabaev2 import LanguageDict
+    from abaevdb import Base, Unit, sync_language_tables, sync_units, update_full_entries
+
+    langs = LanguageDict.from_csv(args.langs)
+    data = read_csv_dir(args.csv_dir)
+
+    engine = db.create_engine(f"sqlite:///{args.db}")
+    if not db_utils.database_exists(engine.url):
+        db_utils.create_database(engine.url)
+    Base.metadata.create_all(engine)
+    # create_all does not add indexes to tables that already exist
+    for index in Unit.__table__.indexes:
+        index.create(engine, checkfirst=True)
+    session = sessionmaker(bind=engine)()
+
+    # Languages, the closure and the units are upserted, so rerunning on an existing database updates it in place
+    sync_language_tables(session, langs, data, glottolog_path=args.glottolog)
+    sync_units(session, data.entries)
+    session.commit()
+
+    # Materialize the entry documents into Unit.full_entry; bundles whose records did not change since the last run
+    # are skipped
+    counts = update_full_entries(session, args.csv_dir)
+    print(f"entry documents: {counts['built']} built, {counts['unchanged']} unchanged, {counts['removed']} removed")
+
+
+def fill_coords(args):
+    # Fill in the missing coordinates of languages in langnames.csv from Glottolog
+    from pyglottolog import Glottolog
+    import libabaev
+
+    langdata = libabaev.LanguageDict.from_csv(args.langs)
+    glottolog = Glottolog(args.glottolog)
+    for key in langdata:
+        lang = langdata[key]
+        if not lang.latitude:
+            languoid = glottolog.languoid(lang.glottocode)
+            if languoid:
+                lang.latitude = languoid.latitude
+                lang.longitude = languoid.longitude
+
+    langdata.write_csv(open(args.output, "w") if args.output else sys.stdout)
+
+
+def plot_map(args):
+    # Map of the languages cited in the etymology of an entry, Ossetic itself marked in red
+    import folium
+    from libabaev2 import LanguageDict, find_file, get_mentioneds_from_csv
+    from abaevlangs import LanguageHierarchy
+
+    langs = LanguageDict.from_csv(args.langs)
+    mentioneds = get_mentioneds_from_csv(find_file(os.path.join(args.csv_dir, "mentioneds.csv")))
+    ossetic = LanguageHierarchy.from_language_dict(langs).family("os")
+    entry_id = args.entry if args.entry.startswith("entry_") else "entry_" + args.entry
+
+    m = folium.Map(tiles="Stamen Terrain", location=[42.98, 44.61], zoom_start=4)
+    folium.Marker(location=[42.98, 44.61], icon=folium.Icon(color='red')).add_to(m)
+    for mentioned in mentioneds.values():
+        if mentioned.entry_id != entry_id:
+            continue
+        form = mentioned.form[0] if mentioned.form else ''
+        gloss = "‘" + mentioned.gloss_en[0] + "’" if mentioned.gloss_en else ''
+        for lang in mentioned.langs or []:
+            if lang in langs and lang not in ossetic and langs[lang].latitude not in (None, -99):
+                folium.Marker(location=[langs[lang].latitude, langs[lang].longitude],
+                              tooltip=folium.Tooltip(text=form, permanent=True),
+                              popup=folium.Popup(html=langs[lang].name_en + " <i>" + form + "</i> " + gloss,
+                                                 show=False)).add_to(m)
+    m.save(args.output)
+
+
+def search(args):
+    from libabaev2 import find_file, get_entries_from_csv, get_forms_from_csv
+    from abaevsearch import LemmaIndex
+
+    index = LemmaIndex.from_dicts(get_entries_from_csv(find_file(os.path.join(args.csv_dir, "entries.csv"))),
+                                  get_forms_from_csv(find_file(os.path.join(args.csv_dir, "forms.csv"))))
+    for query in args.queries:
+        print(query)
+        for match in index.search(query, k=args.limit):
+            print(f"  {match.score:.3f}  {match.record.text}  {match.record.db_id}")
+
+
+def translit(args):
+    from abaevcyr import transliterate
+    for text in args.texts:
+        print(transliterate(text, args.lang))
+
+
+def stats(args):
+    from libabaev2 import find_file, get_entries_from_csv, get_mentioneds_from_csv
+    from abaevstats import ContactMatrix
+
+    matrix = ContactMatrix.from_dicts(get_entries_from_csv(find_file(os.path.join(args.csv_dir, "entries.csv"))),
+                                      get_mentioneds_from_csv(find_file(os.path.join(args.csv_dir,
+                                                                                     "mentioneds.csv"))))
+    if not args.codes:
+        for code, n in matrix.language_counts(k=args.limit):
+            print(f"{code}\t{n}")
+    for code in args.codes:
+        print(f"{code}: co-occurs with " + ", ".join(f"{other} {n}" for other, n in
+                                                     matrix.cooccurring(code, args.limit)))
+        print(f"{code}: by entry language {matrix.breakdown(code)}")
+
+
+def cldf(args):
+    import time
+    from libabaev2 import LanguageDict
+    from abaevcldf import export_cldf
+
+    start = time.perf_counter()
+    counts = export_cldf(args.csv_dir, LanguageDict.from_csv(args.langs), args.output_dir,
+                         validate=not args.no_validate)
+    for table, n in counts.items():
+        print(f"{table}: {n}")
+    print(f"{time.perf_counter() - start:.1f}s")
+
+
+def source(args):
+    from libabaev2 import find_file
+    from abaevsource import SourceIndex, SourceReader
+
+    reader = SourceReader(SourceIndex.read(find_file(args.index)), directory=args.entries_dir)
+    for xml_id in args.ids:
+        fragment = reader.fragment(xml_id)
+        if fragment is None:
+            print(f"{xml_id}: not in {args.index}", file=sys.stderr)
+            continue
+        print(reader.location(xml_id))
+        if not args.location:
+            print(fragment.decode())
+
+
+def build(args):
+    import time
+    from abaevbuild import Builder, nightly_stages, summary
+
+    start = time.perf_counter()
+    stages = nightly_stages(entries_dir=args.entries_dir,
+                            csv_dir=args.csv_dir,
+                            langs=args.langs,
+                            glottolog=args.glottolog,
+                            db=args.db,
+                            filled_langs=args.filled_langs,
+                            maps_dir=args.maps_dir,
+                            map_entries=args.map_entry or [])
+    results = Builder(stages, state_file=args.state, force=args.force, jobs=args.jobs).run()
+    print(summary(results, time.perf_counter() - start))
+    if any(result.status in ("failed", "blocked") for result in results):
+        sys.exit(1)
+
+
+# Commands that are the main() of a module with its own options; their arguments are passed on unparsed
+DELEGATED = {"check": ("abaevcheck", "check references and ids in the CSV files"),
+             "diff": ("abaevdiff", "compare two snapshots, optionally updating the database"),
+             "serve": ("abaevserver", "serve the CSV files as JSON over HTTP")}
+
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="abaevtools", description="Tools for the Abaev etymological dictionary")
+    commands = parser.add_subparsers(dest="command", metavar="command", required=True)
+
+    def add(name: str, run, help: str) -> argparse.ArgumentParser:
+        command = commands.add_parser(name, help=help, description=help)
+        command.set_defaults(run=run)
+        return command
+
+    command = add("extract", extract, "extract the TEI entries into CSV (or Parquet/Feather) files")
+    command.add_argument("--entries-dir", default=ENTRIES_DIR)
+    command.add_argument("--output-dir", default=".")
+    command.add_argument("--duplicates", choices=DUPLICATE_POLICIES, default="warn",
+                         help="what to do when two entry files contain the same xml:id")
+    command.add_argument("--format", choices=FORMATS, default="csv")
+    command.add_argument("--compress", choices=COMPRESSED, default=None, help="compress the CSV output")
+    command.add_argument("--engine", choices=["xpath", "walk"], default="xpath",
+                         help="extract with per-field XPath queries or with a single traversal of each file")
+
+    command = add("load-db", load_db, "load the CSV files into an SQLite database, updating it if it exists")
+    command.add_argument("--csv-dir", default="csv")
+    command.add_argument("--langs", default=LANGS)
+    command.add_argument("--glottolog", default=GLOTTOLOG)
+    command.add_argument("--db", default="abaev.db")
+
+    command = add("fill-coords", fill_coords, "fill in missing language coordinates from Glottolog")
+    command.add_argument("langs", nargs="?", default=LANGS)
+    command.add_argument("--glottolog", default=GLOTTOLOG)
+    command.add_argument("--output", default=None, help="output file, standard output by default")
+
+    command = add("map", plot_map, "plot the languages cited in the etymology of an entry")
+    command.add_argument("entry", help="entry id, with or without the entry_ prefix")
+    command.add_argument("--csv-dir", default="csv")
+    command.add_argument("--langs", default=LANGS)
+    command.add_argument("--output", default="map.html")
+
+    command = add("search", search, "approximate lemma search")
+    command.add_argument("queries", nargs="+")
+    command.add_argument("--csv-dir", default="csv")
+    command.add_argument("--limit", type=int, default=10)
+
+    command = add("translit", translit, "transliterate Latin transcription into Ossetic Cyrillic")
+    command.add_argument("texts", nargs="+")
+    command.add_argument("--lang", default="os-x-iron")
+
+    command = add("stats", stats, "languages cited in the etymologies")
+    command.add_argument("codes", nargs="*", help="show co-occurrence and breakdown for these languages")
+    command.add_argument("--csv-dir", default="csv")
+    command.add_argument("--limit", type=int, default=20)
+
+    command = add("cldf", cldf, "export the CSV files as a CLDF Dictionary dataset")
+    command.add_argument("--csv-dir", default="csv")
+    command.add_argument("--langs", default=LANGS)
+    command.add_argument("--output-dir", default="cldf")
+    command.add_argument("--no-validate", action="store_true", help="skip the (slow) pycldf validation")
+
+    command = add("source", source, "show the TEI source of records by xml:id")
+    command.add_argument("ids", nargs="+")
+    command.add_argument("--index", default="csv/sources.csv", help="index written by extract")
+    command.add_argument("--entries-dir", default=ENTRIES_DIR)
+    command.add_argument("--location", action="store_true", help="print only the file and line")
+
+    command = add("build", build, "run the pipeline stages whose inputs changed since the last build")
+    command.add_argument("--entries-dir", default=ENTRIES_DIR)
+    command.add_argument("--csv-dir", default="csv")
+    command.add_argument("--langs", default=LANGS)
+    command.add_argument("--glottolog", default=GLOTTOLOG)
+    command.add_argument("--db", default="abaev.db")
+    command.add_argument("--filled-langs", default="langnames-coords.csv",
+                         help="langnames.csv with the coordinates filled in from Glottolog")
+    command.add_argument("--maps-dir", default="maps")
+    command.add_argument("--map-entry", action="append", help="entry to plot a map of; may be repeated")
+    command.add_argument("--state", default=".abaevbuild.json", help="fingerprints of the last successful runs")
+    command.add_argument("--force", action="store_true", help="run every stage")
+    command.add_argument("--jobs", type=int, default=4)
+
+    for name, (module, help) in DELEGATED.items():
+        commands.add_parser(name, help=help, description=f"{help}; see {module}.py --help")
+    return parser
+
+
+def main(argv: list[str] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in DELEGATED:
+        import importlib
+        importlib.import_module(DELEGATED[argv[0]][0]).main(argv[1:])
+        return
+    args = make_parser().parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
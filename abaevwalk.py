@@ -0,0 +1,385 @@
+from __future__ import annotations
+from lxml import etree
+from typing import *
+from libabaev2 import *
+
+# Single-traversal extraction engine, an alternative to get_dict_info.
+# get_dict_info queries the entry subtree with XPath once per field, so the same nodes are scanned many times.
+# walk_dict_info walks the document once in document order with lxml.etree.iterwalk, keeps a stack with one frame
+# per open element and collects string values through text buffers that receive every text node while the element
+# they belong to is open. It returns the same records as get_dict_info, in the same order.
+#
+# The document root is walked rather than the entry element because get_mentioneds looks for etym elements in the
+# whole document (//tei:etym) and resolves @corresp against any tei:mentioned in it.
+
+TEI = "{" + NAMESPACES["tei"] + "}"
+ABV = "{" + NAMESPACES["abv"] + "}"
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+WORD_NAMES = {"w", "m", "cl", "phr", "s"}  # Matched by name() in word_elem, i.e. only without a prefix
+
+
+class Frame:
+    __slots__ = ("kind", "element", "buffer", "data")
+
+    def __init__(self, kind: str, element: etree.ElementBase, data: dict = None):
+        self.kind = kind
+        self.element = element
+        self.buffer = None  # Text collected for string(element), if it is needed
+        self.data = data
+
+
+class EntryWalker:
+    def __init__(self, node: etree.ElementBase):
+        self.node = node
+        self.entry_id = node.get(XML_ID)
+        self.stack: list[Optional[Frame]] = []
+        self.buffers: list[list[str]] = []
+        self.langs: list[Optional[str]] = []
+        self.etym_ru = 0  # Number of open etym[@xml:lang='ru'] elements
+        self.etym_en = 0
+        self.entry_frames: list[Frame] = []  # Main entry and subentries in document order
+        self.forms = FormDict()
+        self.mentioneds_ru = MentionedDict()
+        self.mentioneds_en = MentionedDict()
+        self.pending_corresp: list[Tuple[Mentioned, str]] = []
+        self.glosses: dict[str, list[str]] = {}  # Glosses of every tei:mentioned by xml:id, for @corresp
+
+    def capture(self, frame: Frame) -> Frame:
+        frame.buffer = []
+        self.buffers.append(frame.buffer)
+        return frame
+
+    def walk(self) -> Tuple[EntryDict, FormDict, SenseGroupDict, SenseDict, ExampleGroupDict, ExampleDict,
+                            MentionedDict]:
+        in_entry = False
+        for event, element in etree.iterwalk(self.node.getroottree().getroot(),
+                                             events=("start", "end", "comment", "pi")):
+            if event == "start":
+                if element is self.node:
+                    in_entry = True
+                self.langs.append(element.get(XML_LANG) or (self.langs[-1] if self.langs else None))
+                frame = self.start(element, in_entry)
+                self.stack.append(frame)
+                if element.text is not None:
+                    for buffer in self.buffers:
+                        buffer.append(element.text)
+            elif event == "end":
+                frame = self.stack.pop()
+                self.langs.pop()
+                text = None
+                if frame is not None and frame.buffer is not None:
+                    text = "".join(self.buffers.pop())
+                if frame is not None:
+                    self.end(frame, text)
+                if element is self.node:
+                    in_entry = False
+                self.tail(element)
+            else:
+                self.tail(element)
+        return self.results()
+
+    def tail(self, element: etree.ElementBase):
+        if element.tail is None:
+            return
+        for buffer in self.buffers:
+            buffer.append(element.tail)
+        parent = self.stack[-1] if self.stack else None
+        if parent is not None and parent.kind == "word":
+            parent.data["has_text"] = True
+
+    def start(self, element: etree.ElementBase, in_entry: bool) -> Optional[Frame]:
+        tag = element.tag
+        parent = self.stack[-1] if self.stack else None
+        kind = parent.kind if parent is not None else None
+
+        if tag == TEI + "def" or tag == ABV + "tr":
+            # Top-level senses are only taken if they have a tr or def descendant
+            for frame in self.stack:
+                if frame is not None and frame.kind == "sense":
+                    frame.data["has_content"] = True
+
+        if tag == TEI + "etym":
+            lang = element.get(XML_LANG)
+            self.etym_ru += lang == "ru"
+            self.etym_en += lang == "en"
+            return Frame("etym", element, {"lang": lang})
+        if tag == TEI + "mentioned":
+            corresp = element.get("corresp")
+            return Frame("mentioned", element, {"id": element.get(XML_ID),
+                                                "lang": element.get(XML_LANG),
+                                                "extralang": element.get("extralang"),
+                                                "corresp": corresp,
+                                                "russian": self.etym_ru > 0,
+                                                "english": self.etym_en > 0 and corresp is None,
+                                                "words": [],
+                                                "glosses": []})
+        if kind == "mentioned":
+            if tag == TEI + "gloss":
+                return self.capture(Frame("gloss", element, {"quotes": []}))
+            if isinstance(tag, str) and element.prefix is None and etree.QName(element).localname in WORD_NAMES:
+                return self.capture(Frame("word", element, {"has_text": element.text is not None,
+                                                            "rec": element.get("type") == "rec"}))
+            return None
+        if kind == "gloss" and tag == TEI + "q":
+            return self.capture(Frame("gloss_q", element))
+        if not in_entry:
+            return None
+
+        if element is self.node or tag == TEI + "re":
+            if kind == "entry" and not parent.data["main"]:
+                parent.data["has_re"] = True
+            entry = Entry(db_id=element.get(XML_ID), lemma='')
+            if element.get(XML_LANG) is not None:
+                entry.lang = element.get(XML_LANG)
+            if element.get("n") is not None:
+                entry.num = element.get("n")
+            frame = Frame("entry", element, {"entry": entry,
+                                             "main": element is self.node,
+                                             "has_re": False,
+                                             "lemma_started": False,
+                                             "senses": SenseDict(),
+                                             "sense_groups": SenseGroupDict(),
+                                             "examples": ExampleDict(),
+                                             "example_groups": ExampleGroupDict()})
+            self.entry_frames.append(frame)
+            return frame
+
+        if tag == TEI + "form" and kind in ("entry", "form"):
+            form = None
+            # Forms are only collected for the main entry and its nested forms, as get_forms does
+            if parent.data.get("main") or (kind == "form" and parent.data["form"] is not None):
+                form = Form(db_id=element.get(XML_ID),
+                            entry_id=self.entry_id,
+                            orth='',
+                            lang=self.langs[-1])
+                if kind == "form":
+                    form.rel_of = parent.data["form"].db_id
+                    if element.get("type") == "variant":
+                        form.rel_type = FormRelType.VARIANT
+                    elif element.get("type") == "participle":
+                        form.rel_type = FormRelType.PARTICIPLE
+                self.forms[form.db_id] = form
+            lemma_of = parent if kind == "entry" and element.get("type") == "lemma" else None
+            return Frame("form", element, {"form": form, "lemma_of": lemma_of, "orth_started": False})
+        if tag == TEI + "orth" and kind == "form":
+            form_frame = parent
+            lemma_of = form_frame.data["lemma_of"]
+            for_form = not form_frame.data["orth_started"]
+            for_lemma = lemma_of is not None and not lemma_of.data["lemma_started"]
+            form_frame.data["orth_started"] = True
+            if for_lemma:
+                lemma_of.data["lemma_started"] = True
+            if for_form or for_lemma:
+                return self.capture(Frame("orth", element, {"form_frame": form_frame if for_form else None,
+                                                            "lemma_of": lemma_of if for_lemma else None}))
+            return None
+
+        if tag == TEI + "sense":
+            if kind == "entry":
+                return self.capture(Frame("sense", element, self.sense_data(element, parent)))
+            if kind == "sense":
+                data = self.sense_data(element, parent)
+                parent.data["subsenses"].append(data)
+                return Frame("subsense", element, data)
+            return None
+        if tag == TEI + "def" or tag == ABV + "tr":
+            lang = element.get(XML_LANG)
+            if kind in ("sense", "subsense", "example") and lang in ("ru", "en"):
+                if tag == TEI + "def":
+                    if kind != "example" and parent.data["def_" + lang] is None:
+                        parent.data["def_" + lang] = ''
+                        return self.capture(Frame("text", element, {"target": parent.data, "key": "def_" + lang}))
+                    return None
+                return Frame("tr", element, {"owner": parent.data, "lang": lang})
+            return None
+        if tag == TEI + "q" and kind == "tr":
+            key = "tr_" + parent.data["lang"]
+            if parent.data["owner"][key] is None:
+                parent.data["owner"][key] = ''
+                return self.capture(Frame("text", element, {"target": parent.data["owner"], "key": key}))
+            return None
+
+        if tag == ABV + "exampleGrp" and kind == "entry":
+            group = ExampleGroup(db_id=element.get(XML_ID),
+                                 entry_id=parent.data["entry"].db_id)
+            if element.get("n") is not None:
+                group.num = int(element.get("n"))
+            parent.data["example_groups"][group.db_id] = group
+            return Frame("example_group", element, {"group": group, "entry_frame": parent})
+        if tag == ABV + "example" and kind == "example_group" and element.get(XML_LANG) != "ru":
+            return Frame("example", element, {"id": element.get(XML_ID),
+                                              "lang": element.get(XML_LANG),
+                                              "group_frame": parent,
+                                              "quote": None,
+                                              "tr_ru": None,
+                                              "tr_en": None})
+        if tag == TEI + "quote" and kind == "example" and parent.data["quote"] is None:
+            parent.data["quote"] = ''
+            parent.data["quote_has_text"] = element.text is not None
+            return self.capture(Frame("text", element, {"target": parent.data, "key": "quote"}))
+        return None
+
+    @staticmethod
+    def sense_data(element: etree.ElementBase, owner: Frame) -> dict:
+        return {"id": element.get(XML_ID),
+                "lang": element.get(XML_LANG),
+                "n": element.get("n"),
+                "owner": owner,
+                "has_content": False,
+                "subsenses": [],
+                "def_ru": None,
+                "def_en": None,
+                "tr_ru": None,
+                "tr_en": None}
+
+    def end(self, frame: Frame, text: Optional[str]):
+        kind = frame.kind
+        data = frame.data
+        if kind == "text":
+            data["target"][data["key"]] = text
+        elif kind == "orth":
+            if data["form_frame"] is not None and data["form_frame"].data["form"] is not None:
+                data["form_frame"].data["form"].orth = text
+            if data["lemma_of"] is not None:
+                data["lemma_of"].data["entry"].lemma = normalize(text)
+        elif kind == "sense":
+            self.end_sense(frame, text)
+        elif kind == "example":
+            self.end_example(data)
+        elif kind == "etym":
+            self.etym_ru -= data["lang"] == "ru"
+            self.etym_en -= data["lang"] == "en"
+        elif kind == "word":
+            if data["has_text"]:
+                parent = self.stack[-1].data
+                parent["words"].append(("*" if data["rec"] else "") + normalize(text))
+        elif kind == "gloss_q":
+            self.stack[-1].data["quotes"].append(normalize(text))
+        elif kind == "gloss":
+            glosses = self.stack[-1].data["glosses"]
+            if len(data["quotes"]) > 0:
+                glosses += data["quotes"]
+            elif text != '':
+                glosses.append(normalize(text))
+        elif kind == "mentioned":
+            self.end_mentioned(data)
+
+    def end_sense(self, frame: Frame, text: str):
+        data = frame.data
+        # etree.tostring(method='text') in get_senses includes the tail of the sense
+        if not data["has_content"] or normalize(text + (frame.element.tail or '')) == '':
+            return
+        entry_data = data["owner"].data
+        entry_id = entry_data["entry"].db_id
+        lang = data["lang"]
+        num = int(data["n"]) if data["n"] is not None else None
+        if len(data["subsenses"]) > 0:
+            group = SenseGroup(db_id=data["id"],
+                               entry_id=entry_id,
+                               num=num)
+            entry_data["sense_groups"][group.db_id] = group
+            for subsense in data["subsenses"]:
+                if subsense["lang"] is not None:
+                    lang = subsense["lang"]
+                entry_data["senses"][subsense["id"]] = self.make_sense(subsense, entry_id, lang, num, group.db_id)
+        else:
+            entry_data["senses"][data["id"]] = self.make_sense(data, entry_id, lang, num)
+
+    @staticmethod
+    def make_sense(data: dict, entry_id: str, lang: str, num: int, group_id: str = None) -> Sense:
+        desc_ru = data["def_ru"] or ''
+        is_def = False
+        if desc_ru != '':
+            is_def = True
+            desc_en = data["def_en"] or ''
+        else:
+            desc_ru = data["tr_ru"] or ''
+            desc_en = data["tr_en"] or ''
+        return Sense(db_id=data["id"],
+                     entry_id=entry_id,
+                     sense_group=group_id,
+                     lang=lang,
+                     num=num,
+                     is_def=is_def,
+                     description_ru=normalize(desc_ru),
+                     description_en=normalize(desc_en))
+
+    @staticmethod
+    def end_example(data: dict):
+        if data["quote"] is None or not data["quote_has_text"]:
+            return
+        group_frame = data["group_frame"]
+        group = group_frame.data["group"]
+        example = Example(db_id=data["id"],
+                          entry_id=group.entry_id,
+                          example_group=group.db_id,
+                          num=group.num,
+                          text=normalize(data["quote"]),
+                          tr_ru=normalize(data["tr_ru"] or ''),
+                          tr_en=normalize(data["tr_en"] or ''))
+        if data["lang"] is not None:
+            example.lang = data["lang"]
+        group_frame.data["entry_frame"].data["examples"][example.db_id] = example
+
+    def end_mentioned(self, data: dict):
+        node_id = data["id"]
+        if node_id is not None and node_id not in self.glosses:
+            self.glosses[node_id] = data["glosses"]
+        if len(data["words"]) == 0 or not (data["russian"] or data["english"]):
+            return
+        langs = [data["lang"]] if data["lang"] is not None else []
+        if data["extralang"] is not None:
+            langs = langs + data["extralang"].split()
+        entry_id = self.entry_id
+        if data["russian"]:
+            mentioned = Mentioned(db_id=str(node_id),
+                                  xml_id=[str(node_id)],
+                                  entry_id=entry_id,
+                                  langs=langs,
+                                  form=data["words"],
+                                  gloss_ru=data["glosses"],
+                                  gloss_en=[])
+            if data["corresp"] is not None:
+                en_id = data["corresp"][1:]
+                mentioned.xml_id.append(en_id)
+                self.pending_corresp.append((mentioned, en_id))
+            self.mentioneds_ru[mentioned.db_id] = mentioned
+        if data["english"]:
+            mentioned = Mentioned(db_id=str(node_id),
+                                  xml_id=[str(node_id)],
+                                  entry_id=entry_id,
+                                  langs=list(langs),
+                                  form=list(data["words"]),
+                                  gloss_ru=[],
+                                  gloss_en=list(data["glosses"]))
+            self.mentioneds_en[mentioned.db_id] = mentioned
+
+    def results(self) -> Tuple[EntryDict, FormDict, SenseGroupDict, SenseDict, ExampleGroupDict, ExampleDict,
+                               MentionedDict]:
+        for mentioned, en_id in self.pending_corresp:
+            mentioned.gloss_en = list(self.glosses[en_id])
+
+        entries = EntryDict()
+        senses = SenseDict()
+        sense_groups = SenseGroupDict()
+        examples = ExampleDict()
+        example_groups = ExampleGroupDict()
+        for frame in self.entry_frames:
+            data = frame.data
+            if not data["main"]:
+                # Subentries as selected by .//tei:re[not(tei:re) and string(...) != ''] in get_dict_info
+                if data["has_re"] or data["entry"].lemma == '':
+                    continue
+                data["entry"].main_entry = self.entry_id
+            entries[data["entry"].db_id] = data["entry"]
+            senses = senses | data["senses"]
+            sense_groups = sense_groups | data["sense_groups"]
+            examples = examples | data["examples"]
+            example_groups = example_groups | data["example_groups"]
+        return entries, self.forms, sense_groups, senses, example_groups, examples, \
+            self.mentioneds_ru | self.mentioneds_en
+
+
+def walk_dict_info(node: etree.ElementBase) -> \
+        Tuple[EntryDict, FormDict, SenseGroupDict, SenseDict, ExampleGroupDict, ExampleDict, MentionedDict]:
+    return EntryWalker(node).walk()
@@ -0,0 +1,34 @@
+# Benchmark of the storage backends: writes and reads the whole dictionary from the csv/ directory in each format
+# Usage: bench-backends.py [output directory]
+
+import os
+import sys
+import tempfile
+import time
+from libabaev2 import *
+
+data = CsvBackend().read("csv")
+output = sys.argv[1] if len(sys.argv) > 1 else tempfile.mkdtemp()
+
+for name in BACKENDS:
+    backend = get_backend(name)
+    directory = os.path.join(output, name)
+    os.makedirs(directory, exist_ok=True)
+
+    start = time.perf_counter()
+    backend.write(data, directory)
+    written = time.perf_counter()
+    reread = backend.read(directory)
+    read = time.perf_counter()
+    size = sum(os.path.getsize(backend.path(directory, collection)) for collection in COLLECTION_FILES)
+    line = f"{name:8} write {written - start:.3f}s  read {read - written:.3f}s  {size / 1024:.0f} KiB"
+
+    if hasattr(backend, "read_tables"):
+        start = time.perf_counter()
+        backend.read_tables(directory)
+        line += f"  read tables {time.perf_counter() - start:.3f}s"
+    print(line)
+
+    for collection in COLLECTION_FILES:
+        if getattr(reread, collection) != getattr(data, collection):
+            print(f"  {collection} differs after round trip")
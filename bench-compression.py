@@ -0,0 +1,45 @@
+# Benchmark of loading the dictionary from compressed CSV files
+# Usage: bench-compression.py [csv directory]
+# Writes gz, xz and zst copies of the CSV files to a temporary directory and times CsvBackend.read on each, once
+# with the files evicted from the page cache (posix_fadvise DONTNEED, so no root is needed) and once warm.
+
+import os
+import sys
+import tempfile
+import time
+from libabaev2 import *
+
+source = sys.argv[1] if len(sys.argv) > 1 else "csv"
+data = CsvBackend().read(source)
+output = tempfile.mkdtemp()
+
+
+def evict(directory: str):
+    for name in os.listdir(directory):
+        fd = os.open(os.path.join(directory, name), os.O_RDONLY)
+        try:
+            os.fdatasync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def timed_read(directory: str) -> float:
+    start = time.perf_counter()
+    CsvBackend().read(directory)
+    return time.perf_counter() - start
+
+
+for compression in [None] + [extension[1:] for extension in COMPRESSIONS]:
+    name = compression or "plain"
+    directory = os.path.join(output, name)
+    os.makedirs(directory)
+    start = time.perf_counter()
+    CsvBackend(compression=compression).write(data, directory)
+    written = time.perf_counter() - start
+    size = sum(os.path.getsize(os.path.join(directory, file)) for file in os.listdir(directory))
+
+    evict(directory)
+    cold = timed_read(directory)
+    warm = min(timed_read(directory) for _ in range(3))
+    print(f"{name:6} {size / 1024:7.0f} KiB  write {written:.2f}s  read cold {cold:.3f}s  warm {warm:.3f}s")
@@ -0,0 +1,36 @@
+# Benchmark of the inline markup renderer over the examples and senses in the generated CSV files
+# Usage: bench-markup.py [text ...]
+# With texts, prints their tokens, HTML and plain text; without, times rendering all examples and senses with a
+# cold and a warm cache.
+
+import sys
+import time
+from libabaev2 import *
+from abaevmarkup import *
+
+if len(sys.argv) > 1:
+    for text in sys.argv[1:]:
+        print(parse(text))
+        print(to_html(text))
+        print(to_plain(text))
+    sys.exit(0)
+
+examples = get_examples_from_csv("csv/examples.csv")
+senses = get_senses_from_csv("csv/senses.csv")
+texts = [text for example in examples.values() for text in (example.text, example.tr_ru, example.tr_en) if text] + \
+        [text for sense in senses.values() for text in (sense.description_ru, sense.description_en) if text]
+print(f"{len(examples)} examples, {len(senses)} senses, {len(texts)} texts, "
+      f"{sum('%' in text for text in texts)} with markup")
+
+for output in ("html", "plain"):
+    renderer = MarkupRenderer()
+    for cache in ("cold", "warm"):
+        start = time.perf_counter()
+        render_examples(examples, output, renderer)
+        render_senses(senses, output, renderer)
+        print(f"{output}, {cache} cache: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+start = time.perf_counter()
+for text in texts:
+    parse(text)
+print(f"parse only, uncached: {(time.perf_counter() - start) * 1000:.1f}ms")
@@ -0,0 +1,49 @@
+# Benchmark of the approximate lemma search over the generated CSV files
+# Usage: bench-search.py [query ...]
+# With queries, prints the best matches for each; without, times perturbed lemmas from the corpus.
+
+import random
+import sys
+import time
+import unicodedata
+from libabaev2 import *
+from abaevsearch import LemmaIndex
+
+
+def perturb(lemma: str, rnd: random.Random) -> str:
+    # Drop diacritics and apostrophes the way users type, then make one random edit
+    text = "".join(ch for ch in unicodedata.normalize("NFD", lemma) if not unicodedata.combining(ch))
+    text = text.replace("ʼ", "").replace("ʒ", "dz")
+    if len(text) > 2:
+        pos = rnd.randrange(len(text))
+        text = text[:pos] + text[pos + 1:]
+    return text
+
+
+start = time.perf_counter()
+entries = get_entries_from_csv("csv/entries.csv")
+forms = get_forms_from_csv("csv/forms.csv")
+loaded = time.perf_counter()
+index = LemmaIndex.from_dicts(entries, forms)
+built = time.perf_counter()
+print(f"load {loaded - start:.3f}s, index {built - loaded:.3f}s: {len(index)} records, {len(index.keys)} keys")
+
+if len(sys.argv) > 1:
+    for query in sys.argv[1:]:
+        print(query)
+        for match in index.search(query):
+            print(f"  {match.score:.3f}  {match.record.text}  {match.record.db_id}")
+    sys.exit(0)
+
+rnd = random.Random(0)
+lemmas = [entry.lemma for entry in entries.values() if entry.lemma]
+queries = [perturb(rnd.choice(lemmas), rnd) for _ in range(2000)]
+timings = []
+for query in queries:
+    t = time.perf_counter()
+    index.search(query, k=10)
+    timings.append((time.perf_counter() - t) * 1000)
+timings.sort()
+for label, q in [("p50", 0.50), ("p90", 0.90), ("p99", 0.99)]:
+    print(f"{label}: {timings[int(q * (len(timings) - 1))]:.3f} ms")
+print(f"max: {timings[-1]:.3f} ms over {len(timings)} queries")
@@ -0,0 +1,94 @@
+# Load test for abaevserver.py
+# Usage: bench-server.py [--host HOST --port PORT] [--connections N] [--requests N]
+# Without --external, starts abaevserver.py on the given port as a subprocess and stops it afterwards.
+
+import argparse
+import asyncio
+import random
+import subprocess
+import sys
+import time
+from urllib.parse import quote
+from libabaev2 import *
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--host", default="127.0.0.1")
+parser.add_argument("--port", type=int, default=8089)
+parser.add_argument("--connections", type=int, default=32)
+parser.add_argument("--requests", type=int, default=20000)
+parser.add_argument("--external", action="store_true", help="use an already running server")
+args = parser.parse_args()
+
+entries = get_entries_from_csv("csv/entries.csv")
+senses = get_senses_from_csv("csv/senses.csv")
+examples = get_examples_from_csv("csv/examples.csv")
+rnd = random.Random(0)
+entry_ids = list(entries)
+paths = []
+for _ in range(args.requests):
+    kind = rnd.random()
+    if kind < 0.4:
+        paths.append("/entry/" + quote(rnd.choice(entry_ids), safe=""))
+    elif kind < 0.6:
+        subpath = rnd.choice(["/senses", "/examples", "/etymology"])
+        paths.append("/entry/" + quote(rnd.choice(entry_ids), safe="") + subpath)
+    elif kind < 0.8:
+        paths.append("/sense/" + quote(rnd.choice(list(senses)), safe=""))
+    else:
+        paths.append("/example/" + quote(rnd.choice(list(examples)), safe=""))
+
+
+async def wait_for_server():
+    for _ in range(100):
+        try:
+            _, writer = await asyncio.open_connection(args.host, args.port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def client(queue: list[str], timings: list[float], statuses: dict[int, int]):
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    while queue:
+        path = queue.pop()
+        start = time.perf_counter()
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {args.host}\r\n\r\n".encode())
+        status = int((await reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line == b"\r\n":
+                break
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await reader.readexactly(length)
+        timings.append((time.perf_counter() - start) * 1000)
+        statuses[status] = statuses.get(status, 0) + 1
+    writer.close()
+
+
+async def run():
+    await wait_for_server()
+    queue = list(reversed(paths))
+    timings, statuses = [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*(client(queue, timings, statuses) for _ in range(args.connections)))
+    elapsed = time.perf_counter() - start
+    timings.sort()
+    print(f"{len(timings)} requests over {args.connections} connections in {elapsed:.2f}s: "
+          f"{len(timings) / elapsed:.0f} req/s, statuses {statuses}")
+    for label, q in [("p50", 0.50), ("p90", 0.90), ("p99", 0.99)]:
+        print(f"{label}: {timings[int(q * (len(timings) - 1))]:.2f} ms")
+
+
+server = None
+if not args.external:
+    server = subprocess.Popen([sys.executable, "abaevserver.py", "--host", args.host, "--port", str(args.port)])
+try:
+    asyncio.run(run())
+finally:
+    if server:
+        server.terminate()
+        server.wait()
@@ -0,0 +1,53 @@
+# Benchmark of the language-contact statistics over the etymologies in the generated CSV files
+# Usage: bench-stats.py [language code ...]
+# Times the matrix build and the aggregate queries, checks the counts against a plain loop over MentionedDict and
+# prints the top languages, with co-occurring languages and the breakdown by entry language for the given codes.
+
+import sys
+import time
+from libabaev2 import *
+from abaevlangs import LanguageHierarchy
+from abaevstats import ContactMatrix
+
+
+def timed(label: str, function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    print(f"{label:24} {(time.perf_counter() - start) * 1000:8.2f} ms")
+    return result
+
+
+entries = get_entries_from_csv("csv/entries.csv")
+mentioneds = get_mentioneds_from_csv("csv/mentioneds.csv")
+langs = LanguageDict.from_csv("../abaev-tei-oxygen/css/langnames.csv")
+codes = {lang for mentioned in mentioneds.values() for lang in mentioned.langs or []}
+hierarchy = LanguageHierarchy.from_language_dict(langs, codes=codes, glottolog_path="./glottolog")
+# Top-level nodes of the hierarchy that have cited languages below them; only families with more than one cited
+# language are printed
+families = sorted(code for code in hierarchy.ancestors if not hierarchy.ancestors_of(code) and
+                  hierarchy.family(code) & codes)
+
+matrix = timed("build", ContactMatrix.from_dicts, entries, mentioneds)
+print(f"{len(matrix.entry_ids)} entries x {len(matrix.lang_codes)} languages, {matrix.incidence.nnz} nonzero")
+counts = timed("language counts", matrix.language_counts)
+timed("co-occurrence", matrix.cooccurrence)
+timed("co-occurring (cached)", matrix.cooccurring, counts[0][0])
+top = timed("top 5 by family", matrix.top_by_family, hierarchy, families, 5)
+timed("by entry language", matrix.by_entry_language)
+
+expected = {}
+for mentioned in mentioneds.values():
+    if mentioned.entry_id in entries and not entries[mentioned.entry_id].main_entry:
+        for lang in set(mentioned.langs or []):
+            expected.setdefault(lang, set()).add(mentioned.entry_id)
+assert dict(counts) == {lang: len(ids) for lang, ids in expected.items()}, "counts differ from the plain loop"
+
+print()
+for code, n in counts[:10]:
+    print(f"{code:12} {n}")
+for family, ranked in top.items():
+    if len(ranked) > 1:
+        print(f"{family}: " + ", ".join(f"{code} {n}" for code, n in ranked))
+for code in sys.argv[1:]:
+    print(f"{code}: co-occurs with " + ", ".join(f"{other} {n}" for other, n in matrix.cooccurring(code, 5)))
+    print(f"{code}: by entry language {matrix.breakdown(code)}")
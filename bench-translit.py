@@ -0,0 +1,46 @@
+# Benchmark of the Cyrillic transliteration over the forms and examples in the generated CSV files
+# Usage: bench-translit.py [text ...]
+# With texts, prints their Iron and Digor transliterations; without, times the compiled tables against chained
+# str.replace over the same table.
+
+import sys
+import time
+from libabaev2 import *
+from abaevcyr import *
+
+
+def chained_replace(text: str, table: dict[str, str]) -> str:
+    # Longest keys first, as a hand-written replace chain would have to be ordered
+    for key in sorted(table, key=len, reverse=True):
+        text = text.replace(key, table[key])
+    return text
+
+
+if len(sys.argv) > 1:
+    for text in sys.argv[1:]:
+        print(f"{text}  {transliterate(text, 'os-x-iron')}  {transliterate(text, 'os-x-digor')}")
+    sys.exit(0)
+
+forms = get_forms_from_csv("csv/forms.csv")
+examples = get_examples_from_csv("csv/examples.csv")
+texts = [(form.orth, form.lang) for form in forms.values() if form.lang in DIALECTS and form.orth] + \
+        [(example.text, example.lang) for example in examples.values() if example.lang in DIALECTS and example.text]
+chars = sum(len(text) for text, _ in texts)
+print(f"{len(texts)} texts, {chars} characters")
+
+start = time.perf_counter()
+for text, lang in texts:
+    transliterate(text, lang)
+compiled = time.perf_counter() - start
+print(f"compiled: {compiled:.3f}s, {len(texts) / compiled:,.0f} texts/s, {chars / compiled / 1e6:.2f} Mchar/s")
+
+start = time.perf_counter()
+for text, lang in texts:
+    chained_replace(text, TABLES[DIALECTS[lang]])
+chained = time.perf_counter() - start
+print(f"chained replace: {chained:.3f}s, {len(texts) / chained:,.0f} texts/s ({chained / compiled:.1f}x slower)")
+
+start = time.perf_counter()
+transliterate_forms(forms)
+transliterate_examples(examples)
+print(f"batch over FormDict and ExampleDict: {time.perf_counter() - start:.3f}s")
@@ -0,0 +1,37 @@
+# Regression check of abaevcheck against the CSV files shipped in csv/ and a few hand-made records
+# Usage: check-csv.py [csv directory]
+# The shipped files must pass without errors; exits with 1 otherwise.
+
+import sys
+import libabaev2 as abv
+from abaevcheck import check_csv_dir, check_dictionary
+
+failures = 0
+
+
+def expect(name: str, problems: list, messages: list[str]):
+    global failures
+    found = sorted(problem.message for problem in problems if problem.severity == "error")
+    if found != sorted(messages):
+        failures += 1
+        print(f"{name}: expected {messages}, found:")
+        for problem in problems:
+            print(f"  {problem}")
+
+
+problems = check_csv_dir(sys.argv[1] if len(sys.argv) > 1 else "csv")
+expect("shipped csv", problems, [])
+print(f"shipped csv: {len(problems)} problems, {sum(problem.severity == 'warning' for problem in problems)} warnings")
+
+# Mentioned forms may share the id of their equivalent in the other language, but not their own id
+entries = {"entry_a": abv.Entry("entry_a", "a", "os")}
+mentioneds = {db_id: abv.Mentioned(db_id, [db_id, "mentioned_en"], "entry_a", ["ru"], ["x"], None, None)
+              for db_id in ["mentioned_1", "mentioned_2"]}
+expect("shared corresp id", check_dictionary(entries, {}, {}, {}, {}, {}, mentioneds), [])
+mentioneds["entry_a"] = abv.Mentioned("entry_a", ["entry_a"], "entry_a", ["ru"], ["x"], None, None)
+expect("mentioned id used by an entry", check_dictionary(entries, {}, {}, {}, {}, {}, mentioneds),
+       ["id also used in entries"])
+
+if failures:
+    sys.exit(1)
+print("ok")
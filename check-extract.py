@@ -0,0 +1,44 @@
+# Parity check of the two extraction engines: get_dict_info (XPath) and walk_dict_info (single traversal)
+# Usage: check-extract.py [entries directory]
+# Prints every record that differs between the engines and the time spent in each; exits with 1 on differences.
+
+import os
+import sys
+import time
+from lxml import etree
+from libabaev2 import *
+from abaevwalk import walk_dict_info
+
+directory = sys.argv[1] if len(sys.argv) > 1 else "../abaevdict-tei/entries"
+names = ["entries", "forms", "sense_groups", "senses", "example_groups", "examples", "mentioneds"]
+xpath_time = walk_time = 0.0
+differences = 0
+files = 0
+for file in sorted(os.listdir(directory)):
+    if not file.endswith(".xml"):
+        continue
+    tree = etree.parse(os.path.join(directory, file))
+    nodes = tree.xpath("//tei:entry", namespaces=NAMESPACES)
+    if len(nodes) == 0:
+        continue
+    files += 1
+
+    start = time.perf_counter()
+    expected = get_dict_info(node=nodes[0])
+    xpath_time += time.perf_counter() - start
+    start = time.perf_counter()
+    result = walk_dict_info(node=nodes[0])
+    walk_time += time.perf_counter() - start
+
+    for name, old, new in zip(names, expected, result):
+        for db_id in old.keys() | new.keys():
+            if old.get(db_id) != new.get(db_id):
+                differences += 1
+                print(f"{file}: {name}/{db_id}\n  xpath: {old.get(db_id)}\n  walk:  {new.get(db_id)}")
+        if old == new and list(old) != list(new):
+            differences += 1
+            print(f"{file}: {name} in a different order")
+
+print(f"{files} files, {differences} differences; xpath {xpath_time:.3f}s, walk {walk_time:.3f}s")
+if differences:
+    sys.exit(1)
@@ -0,0 +1,64 @@
+# Regression check of DictionaryMerger with ids that occur in several entry files
+# Usage: check-merge.py
+# Exits with 1 if a check fails.
+
+import sys
+import tempfile
+import warnings
+import libabaev2 as abv
+
+failures = 0
+
+
+def expect(name: str, found, expected):
+    global failures
+    if found != expected:
+        failures += 1
+        print(f"{name}:\n  expected {expected}\n  found    {found}")
+
+
+def infos(entries: list[abv.Entry], mentioneds: list[abv.Mentioned] = (), senses: list[abv.Sense] = ()) -> tuple:
+    return ({entry.db_id: entry for entry in entries}, {}, {}, {sense.db_id: sense for sense in senses}, {}, {},
+            {mentioned.db_id: mentioned for mentioned in mentioneds})
+
+
+def mentioned(db_id: str, entry_id: str, same_as: str = None) -> abv.Mentioned:
+    return abv.Mentioned(db_id, [db_id, "mentioned_en"], entry_id, ["ru"], ["x"], None, None, same_as)
+
+
+warnings.simplefilter("ignore")
+
+# WARN: the later record replaces the earlier one and takes its place in the order of the files
+merger = abv.DictionaryMerger(abv.DuplicatePolicy.WARN)
+merger.add("abaev_ada.xml", infos([abv.Entry("entry_ada", "ada", "os"),
+                                   abv.Entry("entry_adaj", "adaj", main_entry="entry_ada")],
+                                  senses=[abv.Sense("sense_1", "entry_adaj", "ru", "en")]), {"entry_ada": 3})
+merger.add("abaev_bada.xml", infos([abv.Entry("entry_bada", "bada", "os"),
+                                    abv.Entry("entry_ada", "ada", "os-x-digor")]), {"entry_ada": 7})
+entries = merger.results()[0]
+expect("warn order", list(entries), ["entry_adaj", "entry_bada", "entry_ada"])
+expect("warn record", entries["entry_ada"].lang, "os-x-digor")
+expect("warn source", merger.source("entries", "entry_ada"), ("abaev_bada.xml", 7))
+
+# Written as CSV, the subentry follows its main entry again, so the files can be read one entry at a time
+with tempfile.TemporaryDirectory() as directory:
+    abv.CsvBackend().write(abv.DictionaryData(*merger.results()[:2], senses=merger.results()[3]), directory)
+    bundles = list(abv.iter_entry_bundles(directory))
+expect("bundles", [(bundle.entry.db_id, list(bundle.subentries), list(bundle.senses)) for bundle in bundles],
+       [("entry_bada", [], []), ("entry_ada", ["entry_adaj"], ["sense_1"])])
+
+# RENAME: the later record gets a new id, in its xml ids and in the references to it as well
+merger = abv.DictionaryMerger(abv.DuplicatePolicy.RENAME)
+merger.add("abaev_a.xml", infos([abv.Entry("entry_a", "a", "os")], [mentioned("m1", "entry_a")]))
+merger.add("abaev_b.xml", infos([abv.Entry("entry_b", "b", "os")],
+                                [mentioned("m1", "entry_b"), mentioned("m2", "entry_b", same_as="m1")]))
+mentioneds = merger.results()[6]
+expect("rename ids", list(mentioneds), ["m1", "m1~2", "m2"])
+expect("rename xml_id", mentioneds["m1~2"].xml_id, ["m1~2", "mentioned_en"])
+expect("rename first xml_id", mentioneds["m1"].xml_id, ["m1", "mentioned_en"])
+expect("rename same_as", mentioneds["m2"].same_as, "m1~2")
+expect("rename source", merger.source("mentioneds", "m1~2")[0], "abaev_b.xml")
+
+if failures:
+    sys.exit(1)
+print("ok")
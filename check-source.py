@@ -0,0 +1,75 @@
+# Regression check of the xml:id source index written by extract, on two small TEI files with start tags that span
+# several lines and a mentioned form id that occurs in both files
+# Usage: check-source.py
+# Exits with 1 if a check fails.
+
+import os
+import sys
+import tempfile
+import warnings
+import libabaev2 as abv
+from abaevsource import SourceIndex, SourceReader
+from abaevtools import main
+
+TEI = """<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0" xmlns:abv="http://ossetic-studies.org/ns/abaevdict">
+<text><body>
+<entry xml:id="entry_{name}" xml:lang="os">
+  <form type="lemma" xml:id="form_{name}1"><orth>{name}</orth>
+    <form type="variant"
+          xml:id="form_{name}2"
+          xml:lang="os-x-digor"><orth>{name}æ</orth></form>
+  </form>
+  <sense
+    xml:id="sense_{name}2"><abv:tr xml:lang="ru"><q>тест</q></abv:tr>
+    <abv:tr xml:lang="en"><q>test</q></abv:tr></sense>
+  <etym xml:lang="ru"><mentioned xml:id="m1" xml:lang="fa"><w>{name}w</w><gloss>g</gloss></mentioned></etym>
+</entry>
+</body></text></TEI>
+"""
+
+failures = 0
+
+
+def expect(name: str, found, expected):
+    global failures
+    if found != expected:
+        failures += 1
+        print(f"{name}:\n  expected {expected!r}\n  found    {found!r}")
+
+
+warnings.simplefilter("ignore")
+with tempfile.TemporaryDirectory() as directory:
+    entries_dir = os.path.join(directory, "entries")
+    os.makedirs(entries_dir)
+    for name in ["a", "b"]:
+        with open(os.path.join(entries_dir, f"abaev_{name}1.xml"), "w") as file:
+            file.write(TEI.format(name=name))
+
+    for policy in ["warn", "rename"]:
+        output_dir = os.path.join(directory, policy)
+        main(["extract", "--entries-dir", entries_dir, "--output-dir", output_dir, "--duplicates", policy])
+        reader = SourceReader(SourceIndex.read(os.path.join(output_dir, "sources.csv")), directory=entries_dir)
+        data = abv.CsvBackend().read(output_dir)
+
+        # Every record can be read back from its source, as the element with its (original) id
+        for collection in abv.COLLECTION_FILES:
+            for db_id in getattr(data, collection):
+                element = reader.element(db_id)
+                expect(f"{policy}: {collection}/{db_id}", element is not None and element.get(abv.XML_ID),
+                       db_id.split("~")[0])
+
+        for name in ["a", "b"]:
+            for xml_id, tag in [(f"form_{name}2", b"<form type"), (f"sense_{name}2", b"<sense\n")]:
+                span = reader.index.lookup(xml_id)
+                expect(f"{policy}: {xml_id} line", span and span.line, 6 if tag == b"<form type" else 10)
+                expect(f"{policy}: {xml_id} start", (reader.fragment(xml_id) or b"")[:len(tag)], tag)
+
+        # The source of a mentioned form is the one its record was taken from
+        for db_id, mentioned in data.mentioneds.items():
+            expect(f"{policy}: {db_id} source", reader.element(db_id).findtext(f"{{{abv.NAMESPACES['tei']}}}w"),
+                   mentioned.form[0])
+
+if failures:
+    sys.exit(1)
+print("ok")
@@ -0,0 +1,36 @@
+# Check of the Cyrillic transliteration of the forms and examples in the generated CSV files
+# Usage: check-translit.py [csv directory]
+# Every ejective mark must have been converted: prints the texts whose Cyrillic still has one outside the segments
+# that are copied unchanged (%i…%i, %s…%s), and exits with 1 if there are any.
+
+import os
+import re
+import sys
+from libabaev2 import *
+from abaevcyr import DIALECTS, VERBATIM, transliterate
+
+directory = sys.argv[1] if len(sys.argv) > 1 else "csv"
+# An ejective mark after a consonant that has an ejective (or after the у of a labialized one) was not converted;
+# other marks are elisions (je ʼrdæǵy, n’ adtæj) and quotes, which Cyrillic spells the same way
+MARKS = re.compile("[кптцчуКПТЦЧУ][ʼ'’]")
+
+forms = get_forms_from_csv(find_file(os.path.join(directory, "forms.csv")))
+examples = get_examples_from_csv(find_file(os.path.join(directory, "examples.csv")))
+texts = [(form.db_id, form.orth, form.lang) for form in forms.values()] + \
+        [(example.db_id, example.text, example.lang) for example in examples.values()]
+
+left = 0
+checked = 0
+for db_id, text, lang in texts:
+    if not text or lang not in DIALECTS:
+        continue
+    checked += 1
+    cyrillic = transliterate(text, lang)
+    converted = "".join(part for i, part in enumerate(VERBATIM.split(cyrillic)) if i % 2 == 0)
+    if MARKS.search(converted):
+        left += 1
+        print(f"{db_id}: {text}  {cyrillic}")
+
+print(f"{checked} texts, {left} with unconverted ejective marks")
+if left:
+    sys.exit(1)
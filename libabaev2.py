@@ -1,11 +1,17 @@
 from __future__ import annotations
-# import os
 import csv
+import gzip
+import lzma
+import os
+import warnings
+from abc import ABC, abstractmethod
+from contextlib import ExitStack
 # import sys
-from dataclasses import dataclass, fields, asdict
+from dataclasses import dataclass, field, fields, asdict
 from enum import Enum
-from lxml import etree
 from typing import *
+# lxml is imported by the functions that extract from TEI, so that reading and writing CSV does not load it;
+# etree in annotations is not evaluated
 
 NAMESPACES = {"tei": "http://www.tei-c.org/ns/1.0", "abv": "http://ossetic-studies.org/ns/abaevdict"}
 
@@ -27,6 +33,32 @@ def normalize(string: str) -> str:
     return " ".join(string.split())
 
 
+# Compressed files are read and written as streams, the compression is chosen by the file extension.
+# zstandard is only imported when a .zst file is opened.
+COMPRESSIONS = [".gz", ".xz", ".zst"]
+
+
+def open_file(filename: str, mode: str = "r"):
+    text_mode = mode if "b" in mode or "t" in mode else mode + "t"
+    if filename.endswith(".gz"):
+        return gzip.open(filename, text_mode)
+    if filename.endswith(".xz"):
+        return lzma.open(filename, text_mode)
+    if filename.endswith(".zst"):
+        import zstandard
+        return zstandard.open(filename, mode)
+    return open(filename, mode)
+
+
+def find_file(filename: str) -> str:
+    # The file itself if it exists, otherwise its compressed version if there is one
+    if not os.path.exists(filename):
+        for extension in COMPRESSIONS:
+            if os.path.exists(filename + extension):
+                return filename + extension
+    return filename
+
+
 @dataclass
 class Language:
     code: str
@@ -42,7 +74,7 @@ class LanguageDict(Dict[str, Language]):
     @classmethod
     def from_csv(cls, filename: str):
         lang_dict = cls()
-        with open(filename) as csv_file:
+        with open_file(filename) as csv_file:
             csv_reader = csv.DictReader(csv_file, delimiter=',')
             for row in csv_reader:
                 for key in row:
@@ -61,6 +93,8 @@ class LanguageDict(Dict[str, Language]):
         return lang_dict
 
     def write_csv(self, file):
+        if isinstance(file, str):
+            file = open_file(file, "w")
         with file as csv_file:
             # fieldnames = list(list(self.values())[1].asdict().keys())
             fieldnames = ["code", "glottolog", "ru", "en", "comment", "lat", "long"]
@@ -97,16 +131,20 @@ def get_entry(node: etree.ElementBase) -> Entry:
 EntryDict = dict[str, Entry]
 
 
+def entry_from_csv_row(row: dict[str, str]) -> Entry:
+    if row["num"] == '':
+        row["num"] = None
+    else:
+        row["num"] = int(row["num"])
+    return DataClassUnpack.instantiate(Entry, row)
+
+
 def get_entries_from_csv(filename: str) -> EntryDict:
     entry_dict = EntryDict()
-    with open(filename, "r") as file:
+    with open_file(filename, "r") as file:
         csv_reader = csv.DictReader(file, delimiter=",")
         for row in csv_reader:
-            if row["num"] == '':
-                row["num"] = None
-            else:
-                row["num"] = int(row["num"])
-            entry_dict[row["db_id"]] = DataClassUnpack.instantiate(Entry, row)
+            entry_dict[row["db_id"]] = entry_from_csv_row(row)
     return entry_dict
 
 
@@ -123,6 +161,7 @@ class Form:
     lang: str  # Language ID
     rel_of: str = None  # If variant or participle of something, ID here
     rel_type: FormRelType = None  # Type of variant or participle
+    orth_cyr: str = None  # orth in Ossetic Cyrillic, see abaevcyr
 
 
 FormDict = dict[str, Form]
@@ -147,17 +186,21 @@ def get_forms(node: etree.ElementBase, entry_id: str, form_id: str = None) -> Fo
     return form_dict
 
 
+def form_from_csv_row(row: dict[str, str]) -> Form:
+    for key in row:
+        if row[key] == '':
+            row[key] = None
+    if row["rel_type"]:
+        row["rel_type"] = FormRelType(row["rel_type"])
+    return DataClassUnpack.instantiate(Form, row)
+
+
 def get_forms_from_csv(filename: str) -> FormDict:
     form_dict = FormDict()
-    with open(filename, "r") as file:
+    with open_file(filename, "r") as file:
         csv_reader = csv.DictReader(file, delimiter=",")
         for row in csv_reader:
-            for key in row:
-                if row[key] == '':
-                    row[key] = None
-            if row["rel_type"]:
-                row["rel_type"] = FormRelType(row["rel_type"])
-            form_dict[row["db_id"]] = DataClassUnpack.instantiate(Form, row)
+            form_dict[row["db_id"]] = form_from_csv_row(row)
     return form_dict
 
 
@@ -178,21 +221,25 @@ class Sense:
 SenseDict = dict[str, Sense]
 
 
+def sense_from_csv_row(row: dict[str, str]) -> Sense:
+    for key in row:
+        if row[key] == '':
+            row[key] = None
+    if row["is_def"] == "1":
+        row["is_def"] = True
+    if row["is_def"] == "0":
+        row["is_def"] = False
+    if row["num"]:
+        row["num"] = int(row["num"])
+    return DataClassUnpack.instantiate(Sense, row)
+
+
 def get_senses_from_csv(filename: str) -> SenseDict:
     sense_dict = SenseDict()
-    with open(filename, "r") as file:
+    with open_file(filename, "r") as file:
         csv_reader = csv.DictReader(file, delimiter=",")
         for row in csv_reader:
-            for key in row:
-                if row[key] == '':
-                    row[key] = None
-            if row["is_def"] == "1":
-                row["is_def"] = True
-            if row["is_def"] == "0":
-                row["is_def"] = False
-            if row["num"]:
-                row["num"] = int(row["num"])
-            sense_dict[row["db_id"]] = DataClassUnpack.instantiate(Sense, row)
+            sense_dict[row["db_id"]] = sense_from_csv_row(row)
     return sense_dict
 
 
@@ -206,17 +253,21 @@ class SenseGroup:
 SenseGroupDict = dict[str, SenseGroup]
 
 
+def sense_group_from_csv_row(row: dict[str, str]) -> SenseGroup:
+    for key in row:
+        if row[key] == '':
+            row[key] = None
+    if row["num"]:
+        row["num"] = int(row["num"])
+    return DataClassUnpack.instantiate(SenseGroup, row)
+
+
 def get_sense_groups_from_csv(filename: str) -> SenseGroupDict:
     sense_group_dict = SenseGroupDict()
-    with open(filename, "r") as file:
+    with open_file(filename, "r") as file:
         csv_reader = csv.DictReader(file, delimiter=",")
         for row in csv_reader:
-            for key in row:
-                if row[key] == '':
-                    row[key] = None
-            if row["num"]:
-                row["num"] = int(row["num"])
-            sense_group_dict[row["db_id"]] = DataClassUnpack.instantiate(SenseGroup, row)
+            sense_group_dict[row["db_id"]] = sense_group_from_csv_row(row)
     return sense_group_dict
 
 
@@ -247,6 +298,7 @@ def sense_from_node(db_id: str,
 
 
 def get_senses(node: etree.ElementBase, entry_id: str) -> Tuple[SenseDict, SenseGroupDict]:
+    from lxml import etree
     sense_dict = SenseDict()
     sense_group_dict = SenseGroupDict()
     for sense_node in node.xpath("tei:sense[descendant::abv:tr or descendant::tei:def]", namespaces=NAMESPACES):
@@ -299,22 +351,27 @@ class Example:
     tr_en: str
     num: int = None
     lang: str = None  # Language ID
+    text_cyr: str = None  # text in Ossetic Cyrillic, see abaevcyr
 
 
 ExampleDict = dict[str, Example]
 
 
+def example_from_csv_row(row: dict[str, str]) -> Example:
+    for key in row:
+        if row[key] == '':
+            row[key] = None
+    if row["num"]:
+        row["num"] = int(row["num"])
+    return DataClassUnpack.instantiate(Example, row)
+
+
 def get_examples_from_csv(filename: str) -> ExampleDict:
     example_dict = ExampleDict()
-    with open(filename, "r") as file:
+    with open_file(filename, "r") as file:
         csv_reader = csv.DictReader(file, delimiter=",")
         for row in csv_reader:
-            for key in row:
-                if row[key] == '':
-                    row[key] = None
-            if row["num"]:
-                row["num"] = int(row["num"])
-            example_dict[row["db_id"]] = DataClassUnpack.instantiate(Example, row)
+            example_dict[row["db_id"]] = example_from_csv_row(row)
     return example_dict
 
 
@@ -328,17 +385,21 @@ class ExampleGroup:
 ExampleGroupDict = dict[str, ExampleGroup]
 
 
+def example_group_from_csv_row(row: dict[str, str]) -> ExampleGroup:
+    for key in row:
+        if row[key] == '':
+            row[key] = None
+    if row["num"]:
+        row["num"] = int(row["num"])
+    return DataClassUnpack.instantiate(ExampleGroup, row)
+
+
 def get_example_groups_from_csv(filename: str) -> ExampleGroupDict:
     example_group_dict = ExampleGroupDict()
-    with open(filename, "r") as file:
+    with open_file(filename, "r") as file:
         csv_reader = csv.DictReader(file, delimiter=",")
         for row in csv_reader:
-            for key in row:
-                if row[key] == '':
-                    row[key] = None
-            if row["num"]:
-                row["num"] = int(row["num"])
-            example_group_dict[row["db_id"]] = DataClassUnpack.instantiate(ExampleGroup, row)
+            example_group_dict[row["db_id"]] = example_group_from_csv_row(row)
     return example_group_dict
 
 
@@ -396,21 +457,25 @@ class Mentioned:
 MentionedDict = dict[str, Mentioned]
 
 
+def mentioned_from_csv_row(row: dict[str, str]) -> Mentioned:
+    for key in row:
+        if row[key] == '':
+            row[key] = None
+    for val in ["xml_id", "langs", "form", "gloss_ru", "gloss_en"]:
+        if row[val]:
+            if ',' in row[val]:
+                row[val] = row[val].split(",")
+            else:
+                row[val] = [row[val]]
+    return DataClassUnpack.instantiate(Mentioned, row)
+
+
 def get_mentioneds_from_csv(filename: str) -> MentionedDict:
     mentioned_dict = MentionedDict()
-    with open(filename, "r") as file:
+    with open_file(filename, "r") as file:
         csv_reader = csv.DictReader(file, delimiter=",")
         for row in csv_reader:
-            for key in row:
-                if row[key] == '':
-                    row[key] = None
-            for val in ["xml_id", "langs", "form", "gloss_ru", "gloss_en"]:
-                if row[val]:
-                    if ',' in row[val]:
-                        row[val] = row[val].split(",")
-                    else:
-                        row[val] = [row[val]]
-            mentioned_dict[row["db_id"]] = DataClassUnpack.instantiate(Mentioned, row)
+            mentioned_dict[row["db_id"]] = mentioned_from_csv_row(row)
     return mentioned_dict
 
 
@@ -674,8 +739,11 @@ def abaev_key(x):
     return x
 
 
-def serialize_dict(dictionary: dict[str, object], file):
-    fieldnames = list(asdict(list(dictionary.values())[0]).keys())
+def serialize_dict(dictionary: dict[str, object], file, record_class: type = None):
+    if record_class is not None:
+        fieldnames = [f.name for f in fields(record_class)]
+    else:
+        fieldnames = list(asdict(list(dictionary.values())[0]).keys())
     csv_writer = csv.DictWriter(file, fieldnames=fieldnames, delimiter=',')
     csv_writer.writeheader()
     for dict_key in dictionary:
@@ -690,6 +758,189 @@ def serialize_dict(dictionary: dict[str, object], file):
         csv_writer.writerow(row)
 
 
+# The whole dictionary as one object, and the base names of the files each collection is stored in
+COLLECTION_FILES = {"entries": "entries",
+                    "forms": "forms",
+                    "senses": "senses",
+                    "sense_groups": "senseGroups",
+                    "examples": "examples",
+                    "example_groups": "exampleGroups",
+                    "mentioneds": "mentioneds"}
+COLLECTION_CLASSES = {"entries": Entry,
+                      "forms": Form,
+                      "senses": Sense,
+                      "sense_groups": SenseGroup,
+                      "examples": Example,
+                      "example_groups": ExampleGroup,
+                      "mentioneds": Mentioned}
+
+
+@dataclass
+class DictionaryData:
+    entries: EntryDict = field(default_factory=EntryDict)
+    forms: FormDict = field(default_factory=FormDict)
+    senses: SenseDict = field(default_factory=SenseDict)
+    sense_groups: SenseGroupDict = field(default_factory=SenseGroupDict)
+    examples: ExampleDict = field(default_factory=ExampleDict)
+    example_groups: ExampleGroupDict = field(default_factory=ExampleGroupDict)
+    mentioneds: MentionedDict = field(default_factory=MentionedDict)
+
+
+def in_entry_order(data: DictionaryData) -> DictionaryData:
+    # The records of every collection grouped by main entry: main entries in their order in data.entries, each
+    # followed by its subentries, and the records of the other collections in the order of the entries they belong
+    # to. The order within a group is kept. Merging files with duplicate ids can leave a subentry before its main
+    # entry, which iter_entry_bundles cannot read.
+    positions = {db_id: i for i, db_id in enumerate(data.entries)}
+    main_positions = {db_id: positions.get(entry.main_entry, positions[db_id]) for db_id, entry in data.entries.items()}
+    ordered = DictionaryData()
+    ordered.entries = dict(sorted(data.entries.items(),
+                                  key=lambda item: (main_positions[item[0]], item[1].main_entry is not None)))
+    for collection in COLLECTION_FILES:
+        if collection != "entries":
+            records = getattr(data, collection)
+            setattr(ordered, collection, dict(sorted(
+                records.items(), key=lambda item: main_positions.get(item[1].entry_id, len(positions)))))
+    return ordered
+
+
+# Storage backends. A backend writes and reads a whole DictionaryData to and from a directory, one file per
+# collection. CSV is the reference format; columnar Arrow formats live in abaevarrow so that pyarrow is only
+# imported when one of them is used.
+class DictionaryBackend(ABC):
+    name: str = None
+    extension: str = None
+
+    def path(self, directory: str, collection: str) -> str:
+        return os.path.join(directory, COLLECTION_FILES[collection] + self.extension)
+
+    @abstractmethod
+    def write(self, data: DictionaryData, directory: str):
+        ...
+
+    @abstractmethod
+    def read(self, directory: str) -> DictionaryData:
+        ...
+
+
+class CsvBackend(DictionaryBackend):
+    name = "csv"
+    extension = ".csv"
+
+    def __init__(self, compression: str = None):
+        # compression is one of the COMPRESSIONS extensions without the dot, e.g. "gz"; reading finds compressed
+        # files by itself
+        if compression:
+            self.extension = ".csv." + compression
+
+    readers = {"entries": get_entries_from_csv,
+               "forms": get_forms_from_csv,
+               "senses": get_senses_from_csv,
+               "sense_groups": get_sense_groups_from_csv,
+               "examples": get_examples_from_csv,
+               "example_groups": get_example_groups_from_csv,
+               "mentioneds": get_mentioneds_from_csv}
+
+    def write(self, data: DictionaryData, directory: str):
+        # In entry order, which iter_entry_bundles relies on
+        data = in_entry_order(data)
+        for collection in COLLECTION_FILES:
+            with open_file(self.path(directory, collection), "w") as file:
+                serialize_dict(getattr(data, collection), file, COLLECTION_CLASSES[collection])
+
+    def read(self, directory: str) -> DictionaryData:
+        data = DictionaryData()
+        for collection, reader in self.readers.items():
+            filename = find_file(os.path.join(directory, COLLECTION_FILES[collection] + ".csv"))
+            setattr(data, collection, reader(filename))
+        return data
+
+
+BACKENDS = ["csv", "parquet", "feather"]
+
+
+def get_backend(name: str, compression: str = None) -> DictionaryBackend:
+    if name == "csv":
+        return CsvBackend(compression=compression)
+    if name in ("parquet", "feather"):
+        from abaevarrow import ArrowBackend
+        return ArrowBackend(file_format=name)
+    raise ValueError(f"Unknown backend: {name}")
+
+
+# Streaming access to the CSV files one main entry at a time. CsvBackend writes every file in the same entry order
+# (see in_entry_order), so the seven files can be merge-joined on that order: the bundle for a main entry
+# is built from the rows at the head of each file, and only one bundle is in memory at a time.
+@dataclass
+class EntryBundle:
+    entry: Entry
+    subentries: EntryDict = field(default_factory=EntryDict)
+    forms: FormDict = field(default_factory=FormDict)
+    senses: SenseDict = field(default_factory=SenseDict)
+    sense_groups: SenseGroupDict = field(default_factory=SenseGroupDict)
+    examples: ExampleDict = field(default_factory=ExampleDict)
+    example_groups: ExampleGroupDict = field(default_factory=ExampleGroupDict)
+    mentioneds: MentionedDict = field(default_factory=MentionedDict)
+
+
+CSV_ROW_READERS = {"entries": entry_from_csv_row,
+                   "forms": form_from_csv_row,
+                   "senses": sense_from_csv_row,
+                   "sense_groups": sense_group_from_csv_row,
+                   "examples": example_from_csv_row,
+                   "example_groups": example_group_from_csv_row,
+                   "mentioneds": mentioned_from_csv_row}
+
+
+class CsvRecordStream:
+    def __init__(self, file, from_row: Callable[[dict[str, str]], object]):
+        self.rows = csv.DictReader(file, delimiter=",")
+        self.from_row = from_row
+        self.head = None
+        self.advance()
+
+    def advance(self):
+        row = next(self.rows, None)
+        self.head = self.from_row(row) if row is not None else None
+
+
+def iter_entry_bundles(directory: str = "csv") -> Iterator[EntryBundle]:
+    with ExitStack() as stack:
+        streams = {}
+        for collection, name in COLLECTION_FILES.items():
+            file = stack.enter_context(open_file(find_file(os.path.join(directory, name + ".csv")), "r"))
+            streams[collection] = CsvRecordStream(file, CSV_ROW_READERS[collection])
+        entries = streams.pop("entries")
+        seen = set()  # Ids of the entries already bundled, to detect files that are not in entry order
+
+        while entries.head is not None:
+            bundle = EntryBundle(entry=entries.head)
+            if bundle.entry.main_entry:
+                raise ValueError(f"Subentry {bundle.entry.db_id} does not follow its main entry "
+                                 f"{bundle.entry.main_entry} in entries.csv")
+            entries.advance()
+            while entries.head is not None and entries.head.main_entry == bundle.entry.db_id:
+                bundle.subentries[entries.head.db_id] = entries.head
+                entries.advance()
+
+            ids = {bundle.entry.db_id} | bundle.subentries.keys()
+            seen |= ids
+            for collection, stream in streams.items():
+                records = getattr(bundle, collection)
+                while stream.head is not None and stream.head.entry_id in ids:
+                    records[stream.head.db_id] = stream.head
+                    stream.advance()
+                if stream.head is not None and stream.head.entry_id in seen:
+                    raise ValueError(f"{COLLECTION_FILES[collection]}.csv is not in the entry order of entries.csv "
+                                     f"({stream.head.db_id} belongs to {stream.head.entry_id})")
+            yield bundle
+
+        for collection, stream in streams.items():
+            if stream.head is not None:
+                raise ValueError(f"{COLLECTION_FILES[collection]}.csv has records of unknown entries "
+                                 f"({stream.head.db_id} belongs to {stream.head.entry_id})")
+
+
 def get_dict_info(node: etree.ElementBase) -> \
         Tuple[EntryDict, FormDict, SenseGroupDict, SenseDict, ExampleGroupDict, ExampleDict, MentionedDict]:
     entries = EntryDict()
@@ -728,3 +979,141 @@ def get_dict_info(node: etree.ElementBase) -> \
             entries[subentry.db_id] = subentry
 
     return entries, forms, sense_groups, senses, example_groups, examples, mentioneds
+
+
+# Merging the per-file dictionaries. The same xml:id in two entry files (usually a copy-pasted entry) used to be
+# silently overwritten by `|`; the merger detects the collision and handles it according to a policy.
+class DuplicatePolicy(Enum):
+    STRICT = "strict"  # Raise DuplicateIdError before anything from the offending file is merged
+    WARN = "warn"  # Warn and let the later record overwrite the earlier one (the old behaviour)
+    RENAME = "rename"  # Keep both, give the later record a new id and update its xml ids and the references to it
+
+
+class DuplicateIdError(ValueError):
+    pass
+
+
+XML_ID = "{http://www.w3.org/XML/1998/namespace}id"
+
+
+def source_lines(tree: etree.ElementTree) -> dict[str, int]:
+    from lxml import etree
+    return {element.get(XML_ID): element.sourceline
+            for element in tree.iter(tag=etree.Element) if element.get(XML_ID) is not None}
+
+
+class SourceFiles(list):
+    # Interned table of source file names, records refer to their file by its position
+    def __init__(self):
+        super().__init__()
+        self.positions: dict[str, int] = {}
+
+    def intern(self, filename: str) -> int:
+        if filename not in self.positions:
+            self.positions[filename] = len(self)
+            self.append(filename)
+        return self.positions[filename]
+
+
+class MergedDict(dict):
+    # Provenance is one integer per record: file position in the high bits, line in the low 32 bits
+    def __init__(self, files: SourceFiles):
+        super().__init__()
+        self.files = files
+        self.origins: dict[str, int] = {}
+
+    def add(self, db_id: str, record, file_no: int, line: int = 0):
+        # A replaced record moves to the end, so that records stay in the order of the files they come from
+        self.pop(db_id, None)
+        self[db_id] = record
+        self.origins[db_id] = file_no << 32 | line
+
+    def source(self, db_id: str) -> Optional[Tuple[str, int]]:
+        origin = self.origins.get(db_id)
+        if origin is None:
+            return None
+        return self.files[origin >> 32], origin & 0xFFFFFFFF
+
+    def source_str(self, db_id: str) -> str:
+        filename, line = self.source(db_id)
+        return f"{filename}:{line}" if line else filename
+
+
+# Order of the collections as returned by get_dict_info, and the fields in other records that refer to each one
+MERGED_COLLECTIONS = ["entries", "forms", "sense_groups", "senses", "example_groups", "examples", "mentioneds"]
+REFERENCE_FIELDS = {"entries": ["entry_id", "main_entry"],
+                    "forms": ["rel_of"],
+                    "sense_groups": ["sense_group"],
+                    "example_groups": ["example_group"],
+                    "mentioneds": ["same_as"]}
+
+
+class DictionaryMerger:
+    def __init__(self, policy: DuplicatePolicy = DuplicatePolicy.WARN):
+        self.policy = policy
+        self.files = SourceFiles()
+        self.collections = {name: MergedDict(self.files) for name in MERGED_COLLECTIONS}
+        self.original_ids: dict[str, str] = {}  # Renamed id -> id in its source file
+
+    def add(self, filename: str, infos: Tuple[dict, ...], lines: dict[str, int] = None):
+        lines = lines or {}
+        file_no = self.files.intern(filename)
+        batch = dict(zip(MERGED_COLLECTIONS, infos))
+
+        collisions = [(name, db_id) for name in MERGED_COLLECTIONS
+                      for db_id in batch[name] if db_id in self.collections[name]]
+        messages = [f"duplicate {name} id {db_id} in {filename}:{lines.get(db_id, 0)}, "
+                    f"first seen in {self.collections[name].source_str(db_id)}" for name, db_id in collisions]
+        if collisions and self.policy == DuplicatePolicy.STRICT:
+            raise DuplicateIdError("\n".join(messages))
+        if self.policy == DuplicatePolicy.WARN:
+            for message in messages:
+                warnings.warn(message)
+        original_ids = {}
+        if collisions and self.policy == DuplicatePolicy.RENAME:
+            batch, original_ids = self.rename(batch, collisions)
+            self.original_ids.update(original_ids)
+
+        for name in MERGED_COLLECTIONS:
+            merged = self.collections[name]
+            for db_id, record in batch[name].items():
+                merged.add(db_id, record, file_no, lines.get(original_ids.get(db_id, db_id), 0))
+
+    def rename(self, batch: dict[str, dict], collisions: list[Tuple[str, str]]) -> \
+            Tuple[dict[str, dict], dict[str, str]]:
+        renames = {name: {} for name in MERGED_COLLECTIONS}
+        for name, db_id in collisions:
+            counter = 2
+            while f"{db_id}~{counter}" in self.collections[name] or f"{db_id}~{counter}" in batch[name]:
+                counter += 1
+            renames[name][db_id] = f"{db_id}~{counter}"
+            warnings.warn(f"duplicate {name} id {db_id} renamed to {db_id}~{counter}, "
+                          f"first seen in {self.collections[name].source_str(db_id)}")
+
+        renamed_batch = {}
+        original_ids = {new_id: db_id for name in renames for db_id, new_id in renames[name].items()}
+        for name in MERGED_COLLECTIONS:
+            renamed_batch[name] = {}
+            for db_id, record in batch[name].items():
+                new_id = renames[name].get(db_id, db_id)
+                record.db_id = new_id
+                for target, field_names in REFERENCE_FIELDS.items():
+                    for field_name in field_names:
+                        value = getattr(record, field_name, None)
+                        if value in renames[target]:
+                            setattr(record, field_name, renames[target][value])
+                # The xml ids of a mentioned form include its own id, which is renamed with it
+                if name == "mentioneds" and record.xml_id:
+                    record.xml_id = [renames[name].get(xml_id, xml_id) for xml_id in record.xml_id]
+                renamed_batch[name][new_id] = record
+        return renamed_batch, original_ids
+
+    def source(self, collection: str, db_id: str) -> Optional[Tuple[str, int]]:
+        return self.collections[collection].source(db_id)
+
+    def original_id(self, db_id: str) -> str:
+        return self.original_ids.get(db_id, db_id)
+
+    def results(self) -> \
+            Tuple[EntryDict, FormDict, SenseGroupDict, SenseDict, ExampleGroupDict, ExampleDict, MentionedDict]:
+        return tuple(self.collections[name] for name in MERGED_COLLECTIONS)